@@ -0,0 +1,5 @@
+#!/usr/bin/env python3
+"""Benchmarks for datatracker.
+
+Run with `python -m benchmarks`; see `python -m benchmarks --help`.
+"""
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import random
+from logzero import logger
+from datatracker import Tracker, Entry, InputFile, OutputFile
+from datatracker.schema import category_template
+
+
+def generate_entries(n_entries, n_tags=None, versions_per_tag=5, files_per_entry=4, seed=0):
+    """Synthetic entries shaped like a real pipeline.
+
+    Tags are spread over the categories and modules of
+    `schema.category_template`. Each tag has up to `versions_per_tag`
+    versions. Entries read the outputs of an earlier tag, so the lineage
+    graph is connected. Half of each entry's files are inputs and half are
+    outputs, under `gs://` paths. Inputs are marked as existing instead of
+    being checked, so no storage is touched.
+
+    Parameters
+    ----------
+    n_entries : int
+        Number of entries
+    n_tags : int, optional
+        Number of distinct tags, by default n_entries / versions_per_tag
+    versions_per_tag : int, optional
+        Versions of each tag, by default 5
+    files_per_entry : int, optional
+        Input plus output files of each entry, by default 4
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    list
+        Entries in the order a pipeline would save them
+
+    Examples
+    --------
+    >>> entries = generate_entries(10000, files_per_entry=20)
+    """
+    rng = random.Random(seed)
+    n_tags = n_tags or max(1, n_entries // versions_per_tag)
+    modules = [(category, module) for category, modules in category_template.items()
+               for module in modules or [category]]
+    tags = [(f"step-{i}", *modules[i % len(modules)]) for i in range(n_tags)]
+    n_inputs = files_per_entry // 2
+    n_outputs = files_per_entry - n_inputs
+    entries = []
+    for i in range(n_entries):
+        t = i % n_tags
+        tag, category, module = tags[t]
+        version = f"0.{i // n_tags}.{rng.randrange(10)}"
+        entry = Entry(tag, f"Synthetic step {t}", category, module, version=version)
+        entry['time'] = 1.6e9 + i
+        for j in range(n_inputs):
+            upstream = rng.randrange(t) if t else None
+            path = (f"gs://bucket/{tags[upstream][0]}/output-{j % n_outputs}.tsv.bgz"
+                    if upstream is not None else f"gs://bucket/raw/input-{t}-{j}.vcf.bgz")
+            entry.add(InputFile(path=path, description=f"Input {j}", tag=f"input-{j}", defer=True))
+            entry['input_files'][-1]['exists'] = True
+        for j in range(n_outputs):
+            entry.add(OutputFile(path=f"gs://bucket/{tag}/output-{j}.tsv.bgz",
+                                 description=f"Output {j}", tag=f"output-{j}"))
+        entries.append(entry)
+    return(entries)
+
+
+def generate_tracker(path, n_entries, storage=None, **kwargs):
+    """Create a tracker at path filled with synthetic entries.
+
+    Parameters
+    ----------
+    path : str
+        Path of the new tracker; an existing file is replaced
+    n_entries : int
+        Number of entries
+    storage : str, optional
+        Storage backend, by default inferred from the path
+    **kwargs
+        Passed to `generate_entries`
+
+    Returns
+    -------
+    Tracker
+    """
+    for p in (path, f"{path}.lock", f"{path}.paths.sqlite"):
+        if os.path.exists(p):
+            os.remove(p)
+    tr = Tracker(path, storage=storage)
+    tr.save_many(generate_entries(n_entries, **kwargs))
+    return(tr)
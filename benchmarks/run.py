@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+from logzero import logger
+from datatracker import Tracker, Entry, OutputFile
+from datatracker.git import describe, git_info
+from datatracker.graph import LineageGraph
+from datatracker.utils import sort_versions
+from .generate import generate_entries, generate_tracker
+
+SIZES = (1000, 10000, 100000)
+BACKENDS = {'json': 'tracker.json', 'sqlite': 'tracker.sqlite', 'journal': 'tracker.jsonl'}
+
+
+def measure(fn, repeat=5, number=1):
+    """Time fn, returning per-call seconds over `repeat` rounds of `number` calls.
+
+    fn is called once first, untimed, so lazy imports and index builds are
+    not counted.
+    """
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return({'min': min(times), 'median': statistics.median(times), 'repeat': repeat, 'number': number})
+
+
+def new_entry(i, tag=None):
+    entry = Entry(tag or f"bench-{i}", 'Benchmark entry', 'Analysis', 'Browser', version=f"1.0.{i}")
+    entry.add(OutputFile(tag='output', path=f"gs://bucket/bench/{i}.tsv", description='Output'))
+    return(entry)
+
+
+def bench_tracker(tr, size, repeat):
+    """Time the tracker operations on a populated tracker."""
+    rng = random.Random(1)
+    tags = sorted(tr.index.tags)
+    counter = iter(range(10 ** 9))
+    results = {}
+    results['save'] = measure(lambda: tr.save(new_entry(next(counter))), repeat=repeat)
+    results['get_entry'] = measure(lambda: tr.get_entry(rng.choice(tags)), repeat=repeat, number=100)
+    results['get_file_path'] = measure(
+        lambda: tr.get_file_path(rng.choice(tags), 'output-0'), repeat=repeat, number=100)
+    results['filter_indexed'] = measure(
+        lambda: tr.filter(tr.entry.tag == rng.choice(tags)), repeat=repeat, number=10)
+    results['filter_scan'] = measure(
+        lambda: tr.filter(tr.entry.description.matches('Synthetic step 1.*')), repeat=repeat)
+    results['to_pandas'] = measure(lambda: tr.to_pandas(most_recent=False), repeat=repeat)
+    results['explode'] = measure(lambda: tr.explode(most_recent=False), repeat=repeat)
+    results['stale'] = measure(tr.stale, repeat=repeat)
+    try:
+        import openpyxl
+    except ImportError:
+        logger.warning('openpyxl is not installed, skipping to_excel')
+    else:
+        path = f"{tr.path}.xlsx"
+        results['to_excel'] = measure(lambda: tr.to_excel(path, most_recent=False), repeat=1)
+    return(results)
+
+
+def bench_import():
+    """Seconds to import datatracker in a fresh interpreter."""
+    code = 'import time; t = time.perf_counter(); import datatracker; print(time.perf_counter() - t)'
+    times = [float(subprocess.run([sys.executable, '-c', code], capture_output=True, check=True,
+                                  cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+                   .stdout) for _ in range(5)]
+    return({'min': min(times), 'median': statistics.median(times), 'repeat': 5, 'number': 1})
+
+
+def bench_save_tags(directory, size, repeat):
+    """Save cost on trackers of the same size with few and with many tags."""
+    results = {}
+    for n_tags in (10, size // 5):
+        tr = generate_tracker(os.path.join(directory, f"tags-{n_tags}.json"), size, n_tags=n_tags)
+        counter = iter(range(10 ** 9))
+        results[f"save_{n_tags}_tags"] = measure(
+            lambda: tr.save(new_entry(next(counter), tag='step-0')), repeat=repeat)
+    return(results)
+
+
+def _concurrent_saves(args):
+    path, worker, n = args
+    tr = Tracker(path)
+    for i in range(n):
+        tr.save(new_entry(i, tag=f"worker-{worker}"))
+
+
+def bench_concurrency(directory, processes=8, saves=25):
+    """Concurrent saves from several processes; checks none are lost or duplicated."""
+    results = {}
+    for backend, name in BACKENDS.items():
+        path = os.path.join(directory, f"concurrent-{name}")
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(_concurrent_saves, [(path, w, saves) for w in range(processes)])
+        seconds = time.perf_counter() - start
+        tr = Tracker(path)
+        saved, stored = len(set(tr['tag_version'])), len(tr)
+        if saved != processes * saves or stored != saved:
+            logger.error(f"{backend}: {saved} of {processes * saves} concurrent saves persisted, "
+                         f"{stored - saved} duplicated")
+        results[f"concurrent_save_{backend}"] = {
+            'seconds': seconds, 'processes': processes, 'saves': processes * saves, 'persisted': saved,
+            'duplicated': stored - saved}
+    return(results)
+
+
+def bench_explode_wide(directory, entries=50000, files=20):
+    """explode on entries with many files each."""
+    tr = generate_tracker(os.path.join(directory, 'wide.json'), entries, files_per_entry=files)
+    return({f"explode_{entries}x{files}": measure(lambda: tr.explode(most_recent=False), repeat=3)})
+
+
+def bench_version_sort(n=1000000):
+    """sort_versions on n git describe style version strings."""
+    rng = random.Random(0)
+    versions = [f"{rng.randrange(3)}.{rng.randrange(20)}.{rng.randrange(50)}"
+                + (f"+{rng.randrange(30)}.g{rng.randrange(16 ** 7):07x}" if rng.random() < 0.5 else '')
+                for _ in range(n)]
+    return({f"sort_versions_{n}": measure(lambda: sort_versions(versions), repeat=3)})
+
+
+def bench_lineage(n_tags=100000):
+    """Lineage graph build and traversals over n_tags tags, held in memory."""
+    docs = {i: entry.properties for i, entry in enumerate(
+        generate_entries(n_tags, versions_per_tag=1, files_per_entry=4))}
+    graph = LineageGraph(docs)
+    rng = random.Random(2)
+    tags = sorted(graph.nodes)
+    return({f"graph_build_{n_tags}": measure(lambda: LineageGraph(docs), repeat=3),
+            f"graph_upstream_{n_tags}": measure(lambda: graph.upstream(rng.choice(tags)), number=10),
+            f"graph_downstream_{n_tags}": measure(lambda: graph.downstream(rng.choice(tags)), number=10),
+            f"graph_topological_order_{n_tags}": measure(graph.topological_order, repeat=3)})
+
+
+def bench_entry(number=1000):
+    """Entry creation with the version given, and resolved from git."""
+    def create(version=None):
+        return(Entry('bench', 'Benchmark entry', 'Analysis', 'Browser', version=version))
+    results = {'entry_explicit_version': measure(lambda: create('1.0'), number=number)}
+    saved = os.environ.pop('VERSION', None)
+    try:
+        os.environ['VERSION'] = '1.0'
+        results['entry_env_version'] = measure(create, number=number)
+        del os.environ['VERSION']
+        results['entry_git_version'] = measure(create, number=number)
+        results['describe'] = measure(describe, number=number)
+    finally:
+        os.environ.pop('VERSION', None)
+        if saved is not None:
+            os.environ['VERSION'] = saved
+    return(results)
+
+
+def run(sizes=SIZES, backends=tuple(BACKENDS), repeat=5, extras=True, directory=None):
+    """Run the benchmarks and return machine-readable results.
+
+    Parameters
+    ----------
+    sizes : tuple, optional
+        Numbers of entries of the synthetic trackers, by default 1k, 10k and 100k
+    backends : tuple, optional
+        Storage backends to time, by default json, sqlite and journal
+    repeat : int, optional
+        Timing rounds per operation, by default 5
+    extras : bool, optional
+        Also run import time, save vs tag count, concurrency, wide explode,
+        version sort, lineage graph and entry creation benchmarks, by default
+        True
+    directory : str, optional
+        Where to create trackers, created if missing, by default a temporary
+        directory
+
+    Returns
+    -------
+    dict
+        Environment description and a list of results, each with the
+        benchmark, backend, size and seconds per call
+    """
+    directory = directory or tempfile.mkdtemp(prefix='datatracker-bench-')
+    os.makedirs(directory, exist_ok=True)
+    results = []
+
+    def add(group, backend=None, size=None):
+        for name, timing in group.items():
+            results.append({'benchmark': name, 'backend': backend, 'size': size, **timing})
+            logger.info(f"{name} [{backend or '-'}, {size or '-'}]: "
+                        f"{timing.get('median', timing.get('seconds')):.6f} s")
+
+    for size in sizes:
+        for backend in backends:
+            path = os.path.join(directory, f"{size}-{BACKENDS[backend]}")
+            start = time.perf_counter()
+            tr = generate_tracker(path, size)
+            add({'generate': {'seconds': time.perf_counter() - start}}, backend, size)
+            add(bench_tracker(Tracker(path), size, repeat), backend, size)
+    if extras:
+        add({'import': bench_import()})
+        add(bench_save_tags(directory, max(sizes), repeat), 'json', max(sizes))
+        add(bench_concurrency(directory))
+        add(bench_explode_wide(directory))
+        add(bench_version_sort())
+        add(bench_lineage())
+        add(bench_entry())
+    return({'version': describe(), **git_info(), 'python': platform.python_version(),
+            'platform': platform.platform(), 'time': time.time(), 'results': results})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark datatracker.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help='numbers of entries in the synthetic trackers')
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per operation')
+    parser.add_argument('--no-extras', dest='extras', action='store_false',
+                        help='skip import, concurrency, wide explode, version sort, lineage and entry benchmarks')
+    parser.add_argument('--dir', help='directory for the synthetic trackers')
+    parser.add_argument('--output', help='write results to this JSON file instead of stdout')
+    args = parser.parse_args(argv)
+    os.environ.setdefault('VERSION', 'bench')
+    results = run(args.sizes, args.backends, args.repeat, args.extras, args.dir)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
@@ -1,7 +1,3 @@
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
-
 from .tracker import Tracker
 from .entry import Entry
 from .file import InputFile, OutputFile
@@ -9,4 +5,13 @@ from .dictlist import DictList
 from .schema import category_template
 
 from .file import path_exists
-from .utils import *
\ No newline at end of file
+from .utils import *
+
+
+def __getattr__(name):
+    # Resolving the version may run git, so only do it when asked for
+    if name == '__version__':
+        from ._version import get_versions
+        globals()['__version__'] = get_versions()['version']
+        return(globals()['__version__'])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
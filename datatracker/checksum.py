@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import mmap
+import base64
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from logzero import logger
+from .fs import CHUNK_SIZE, get_fs, run as fs_run
+from .utils import PARALLELISM, is_cloud_path
+
+HASH_THREADS = min(8, os.cpu_count() or 1)
+
+
+def local_checksum(path, chunk_size=CHUNK_SIZE):
+    """MD5 of a local file as 'md5:<hex>'.
+
+    The file is memory mapped and hashed in chunks, so large files are never
+    read into memory at once.
+    """
+    digest = hashlib.md5()
+    with open(os.path.realpath(os.path.expanduser(path)), 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                view = memoryview(m)
+                try:
+                    for i in range(0, len(view), chunk_size):
+                        digest.update(view[i:i + chunk_size])
+                finally:
+                    view.release()
+    return(f"md5:{digest.hexdigest()}")
+
+
+def cloud_checksum(stat):
+    """Checksum of a cloud object from its metadata, without reading it.
+
+    Uses the object's MD5 when it has one, else its CRC32C (composite
+    objects only have the latter). Both are stored base64 encoded by Google
+    Cloud Storage and are returned as hex.
+    """
+    for algorithm in ('md5', 'crc32c'):
+        if stat.get(algorithm):
+            return(f"{algorithm}:{base64.b64decode(stat[algorithm]).hex()}")
+    return(None)
+
+
+def checksums(paths, cache=None, parallelism=PARALLELISM):
+    """Checksums of many local and cloud paths, computed in parallel.
+
+    Local files are hashed on a thread pool, unless the cache holds a
+    checksum for the same path, size and mtime. Cloud checksums come from
+    object metadata, fetched concurrently. Missing paths map to None.
+
+    Parameters
+    ----------
+    paths : list
+        Local or cloud paths
+    cache : PathCache, optional
+        Cache of local file checksums, by default none
+    parallelism : int, optional
+        Maximum number of cloud metadata requests in flight, by default 150
+
+    Returns
+    -------
+    dict
+        Path to checksum, e.g. 'md5:9e107d9d372bb6826bd81d3542a419d6'
+
+    Examples
+    --------
+    >>> checksums(['data/variants.vcf.gz', 'gs://bucket/variants.mt/_SUCCESS'])
+    """
+    paths = list(dict.fromkeys(paths))
+    cloud = [p for p in paths if is_cloud_path(p)]
+    result = _cloud_checksums(cloud, parallelism) if cloud else {}
+    local = [p for p in paths if not is_cloud_path(p)]
+    pending = []
+    for path in local:
+        try:
+            stat = os.stat(os.path.realpath(os.path.expanduser(path)))
+        except OSError:
+            result[path] = None
+            continue
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        cached = cache.get_checksum(*key) if cache is not None else None
+        if cached is None:
+            pending.append(key)
+        else:
+            result[path] = cached
+    if pending:
+        with ThreadPoolExecutor(HASH_THREADS) as pool:
+            computed = list(pool.map(lambda key: _try(local_checksum, key[0]), pending))
+        for key, checksum in zip(pending, computed):
+            result[key[0]] = checksum
+            if cache is not None and checksum is not None:
+                cache.put_checksum(*key, checksum)
+    return(result)
+
+
+def _try(fn, path):
+    try:
+        return(fn(path))
+    except OSError as e:
+        logger.warning(f"Could not checksum {path}: {e}")
+        return(None)
+
+
+def _cloud_checksums(paths, parallelism):
+    # get_fs runs on the fs loop itself, so it must be called outside of it
+    fs = get_fs()
+
+    async def stat_all():
+        sema = asyncio.Semaphore(parallelism)
+
+        async def stat(path):
+            async with sema:
+                try:
+                    return(cloud_checksum(await fs.stat(path)))
+                except FileNotFoundError:
+                    return(None)
+        return(await asyncio.gather(*[stat(path) for path in paths]))
+    return(dict(zip(paths, fs_run(stat_all()))))
+
+
+def checksum_files(entries, cache=None, parallelism=PARALLELISM):
+    """Record a checksum on every input and output file of the entries that lacks one.
+
+    See Also
+    --------
+    checksums
+    """
+    files = [f for entry in entries for key in ('input_files', 'output_files')
+             for f in entry[key] if f.get('checksum') is None and f.get('path')]
+    if not files:
+        return
+    result = checksums([f['path'] for f in files], cache=cache, parallelism=parallelism)
+    for f in files:
+        f['checksum'] = result[f['path']]
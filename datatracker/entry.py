@@ -4,19 +4,124 @@ import os
 import sys
 from logzero import logger
 import time
+import json
+import hashlib
+import functools
 from datetime import date
-import subprocess
 
 from .file import InputFile, OutputFile
+from .fs import get_fs, run as fs_run
+from .git import describe, git_info
+from .utils import is_cloud_path, paths_exist, PARALLELISM
+
+
+def check_files(entries, parallelism=PARALLELISM, cache=None):
+    """Resolve deferred existence checks of input files in one batch.
+
+    Parameters
+    ----------
+    entries : list
+        Entries whose input files were created with `defer=True`
+    parallelism : int, optional
+        Maximum number of cloud checks in flight, by default 150
+    cache : PathCache, optional
+        Cache to answer fresh cloud paths from, by default none
+
+    See Also
+    --------
+    datatracker.utils.paths_exist
+    """
+    pending = [f for entry in entries for f in entry['input_files'] if f.get('exists') is None]
+    if not pending:
+        return
+    paths = [f['path'] for f in pending]
+    if cache is not None:
+        exists = cache.exists_many(paths, parallelism=parallelism)
+    else:
+        exists = paths_exist(paths, parallelism=parallelism)
+    for f in pending:
+        f['exists'] = exists[f['path']]
+
+def fingerprint(entry, cache=None):
+    """Hash of what an entry's computation depends on.
+
+    Covers the entry's tag and version and, for each input file, its path,
+    upstream entry_tag and version, and its checksum, or if it has none its
+    size and mtime or generation.
+
+    Parameters
+    ----------
+    entry : Entry
+    cache : PathCache, optional
+        Cache to record the cloud paths' stats in, by default none; cached
+        records are never trusted here
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest
+    """
+    files = entry['input_files']
+    unsigned = [f['path'] for f in files if f.get('checksum') is None and f.get('path')]
+    if cache is not None:
+        # a stale record would hide a changed input, so always stat afresh
+        stats = cache.stat_many(unsigned, fresh=True)
+    else:
+        stats = {path: _stat(path) for path in unsigned}
+    inputs = []
+    for f in files:
+        signature = f.get('checksum')
+        if signature is None and stats.get(f.get('path')) is not None:
+            stat = stats[f['path']]
+            signature = [stat['size'], None if stat['generation'] is None else str(stat['generation'])]
+        inputs.append([f.get('path'), f.get('entry_tag'), f.get('version'), signature])
+    inputs.sort(key=json.dumps)
+    content = json.dumps([entry['tag'], entry['version'], inputs])
+    return(hashlib.sha256(content.encode()).hexdigest())
+
+
+def _stat(path):
+    try:
+        if is_cloud_path(path):
+            return(fs_run(get_fs().stat(path)))
+        stat = os.stat(os.path.realpath(os.path.expanduser(path)))
+    except OSError:
+        return(None)
+    return({'size': stat.st_size, 'generation': stat.st_mtime_ns})
+
+def _usage():
+    """Snapshot of this process's and its children's resource usage."""
+    usage = {'wall_time': time.perf_counter(), 'cpu_time': time.process_time(),
+             'peak_rss': None, 'read_bytes': None, 'write_bytes': None}
+    try:
+        import resource
+    except ImportError:
+        return(usage)
+    rself, rchildren = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    usage['cpu_time'] = rself.ru_utime + rself.ru_stime + rchildren.ru_utime + rchildren.ru_stime
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    usage['peak_rss'] = max(rself.ru_maxrss, rchildren.ru_maxrss) * scale
+    try:
+        with open('/proc/self/io') as f:
+            io = dict(line.split(': ') for line in f.read().splitlines())
+        usage['read_bytes'], usage['write_bytes'] = int(io['read_bytes']), int(io['write_bytes'])
+    except (OSError, KeyError, ValueError):
+        usage['read_bytes'] = (rself.ru_inblock + rchildren.ru_inblock) * 512
+        usage['write_bytes'] = (rself.ru_oublock + rchildren.ru_oublock) * 512
+    return(usage)
 
 class Entry():
     def __init__(self, tag, description, category, module, version=None):
+        # the dirty flag only matters when the version comes from git describe
+        from_git = not version and 'VERSION' not in os.environ
         self.properties = {
             'tag': tag,
             'description': description,
             'category': category,
             'module': module,
             'version': self.get_version() if not version else str(version),
+            **git_info(dirty=from_git),
             'path': __file__ if 'FILE' not in os.environ else os.environ['FILE'],
             'date': str(date.today()),
             'time': time.time(),
@@ -27,12 +132,92 @@ class Entry():
         extension = os.path.splitext(self['path'])[1]
 
     def get_version(self):
+        """Version from the VERSION environment variable, else `git describe`.
+
+        The git lookup is cached per process and HEAD commit, so creating many
+        entries runs git at most once.
+        """
         if 'VERSION' in os.environ:
             version = os.environ['VERSION']
         else:
-            version = subprocess.run(['git', 'describe'], capture_output=True).stdout.strip().decode()
+            version = describe()
         return(version)
 
+    def fingerprint(self, cache=None):
+        """Hash of this entry's tag, version and input files."""
+        return(fingerprint(self, cache=cache))
+
+    def cached(self, tracker):
+        """Reuse a saved entry with the same inputs, if its outputs still exist.
+
+        If the tracker holds an entry with this entry's fingerprint, its output
+        files are copied onto this entry and True is returned, so the script
+        can skip the computation.
+
+        See Also
+        --------
+        datatracker.tracker.Tracker.is_up_to_date
+
+        Examples
+        --------
+        >>>if not entry.cached(tr):
+        ...    run_step()
+        ...    entry.add(OutputFile(tag='result', path=path, description=''))
+        ...    tr.save(entry)
+        """
+        doc = tracker.find_cached(self)
+        if doc is None:
+            return(False)
+        self['output_files'] = [dict(f) for f in doc['output_files']]
+        return(True)
+
+    def __enter__(self):
+        """Start measuring the step this entry records.
+
+        On exit the entry holds wall_time and cpu_time in seconds, peak_rss in
+        bytes and read_bytes and write_bytes, the storage I/O of the block.
+        CPU time and I/O include child processes once they have been waited
+        for, e.g. by subprocess.run: Linux adds a reaped child's counters to
+        /proc/self/io, and the getrusage fallback reads RUSAGE_CHILDREN.
+        Children still running on exit are not counted. Peak RSS is the
+        largest of the process's and its children's peaks so far, so it
+        covers the block but may predate it.
+
+        Examples
+        --------
+        >>>with Entry('tag', 'description', 'Analysis', 'module') as entry:
+        ...    run_step()
+        >>>tr.save(entry)
+        """
+        self._usage = _usage()
+        return(self)
+
+    def __exit__(self, *exc_info):
+        start, end = self._usage, _usage()
+        for key in ('wall_time', 'cpu_time', 'read_bytes', 'write_bytes'):
+            self[key] = None if start[key] is None else end[key] - start[key]
+        self['peak_rss'] = end['peak_rss']
+        return(False)
+
+    def __call__(self, function):
+        """Use the entry as a decorator measuring each call of a function.
+
+        Examples
+        --------
+        >>>@entry
+        ...def run_step():
+        ...    ...
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self:
+                return(function(*args, **kwargs))
+        return(wrapper)
+
+    def check_files(self, parallelism=PARALLELISM, cache=None):
+        """Resolve deferred existence checks of this entry's input files."""
+        check_files([self], parallelism=parallelism, cache=cache)
+
     def add(self, file):
         if isinstance(file, OutputFile):
             if file['tag'] == 'Artifact':
@@ -60,7 +60,9 @@ class InputFile(File):
         if infer_boolean:
             self.__infer_file_properties(tracker)
 
-        self['exists'] = path_exists(self['path'])
+        defer = kwargs.get('defer', 'DEFER_CHECKS' in os.environ)
+        cache = tracker.paths if tracker is not None else None
+        self['exists'] = None if defer else path_exists(self['path'], cache=cache)
         
     def __infer_file_properties(self, tracker):
         entry = tracker.get_entry(self['entry_tag'], self['version'])
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import re
+import shutil
+import asyncio
+import threading
+import functools
+from logzero import logger
+
+PARALLELISM = 150
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class AsyncFS():
+    """Asynchronous filesystem interface used by the cloud helpers in utils.
+
+    Paths are local paths or `gs://` URLs. Implementations: LocalAsyncFS for
+    local disk (optionally standing in for buckets), CloudAsyncFS for Google
+    Cloud Storage through hailtop, and GsutilAsyncFS, which shells out to
+    gsutil when hailtop is not installed.
+    """
+
+    async def exists(self, path):
+        raise NotImplementedError
+
+    async def ls(self, path):
+        """List a directory one level deep; subdirectories end with '/'."""
+        raise NotImplementedError
+
+    async def stat(self, path):
+        """Return a dict with path, size, mtime, generation, crc32c and md5.
+
+        Fields the filesystem does not provide are None. Raises
+        FileNotFoundError if the path does not exist.
+        """
+        raise NotImplementedError
+
+    async def rm(self, path, recursive=False):
+        raise NotImplementedError
+
+    async def copy(self, src, dest, recursive=False):
+        """Copy a file, or a directory tree if recursive, to the path dest."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def exists_many(self, paths, parallelism=PARALLELISM):
+        """Check many paths with at most `parallelism` checks in flight."""
+        sema = asyncio.Semaphore(parallelism)
+
+        async def check(path):
+            async with sema:
+                return(await self.exists(path))
+        results = await asyncio.gather(*[check(path) for path in paths])
+        return(dict(zip(paths, results)))
+
+
+async def _thread(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return(await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs)))
+
+
+class LocalAsyncFS(AsyncFS):
+    def __init__(self, root=None):
+        """Filesystem on local disk.
+
+        Parameters
+        ----------
+        root : str, optional
+            Directory standing in for cloud storage: `gs://bucket/key` maps to
+            `root/bucket/key`. By default cloud paths are rejected.
+
+        Examples
+        --------
+        >>> set_fs(LocalAsyncFS(root='/tmp/buckets'))
+        """
+        self.root = root
+
+    def local(self, path):
+        if path.startswith('gs://'):
+            if self.root is None:
+                raise ValueError(f"No local root configured for cloud path {path}")
+            return(os.path.join(self.root, path[len('gs://'):]))
+        return(os.path.realpath(os.path.expanduser(path)))
+
+    async def exists(self, path):
+        return(await _thread(os.path.exists, self.local(path)))
+
+    async def ls(self, path):
+        local = self.local(path)
+        if os.path.isfile(local):
+            return([path])
+        if not os.path.isdir(local):
+            return([])
+        names = sorted(os.listdir(local))
+        return([os.path.join(path.rstrip('/'), name) + ('/' if os.path.isdir(os.path.join(local, name)) else '')
+                for name in names])
+
+    async def stat(self, path):
+        stat = await _thread(os.stat, self.local(path))
+        return({'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                'generation': stat.st_mtime_ns, 'crc32c': None, 'md5': None})
+
+    async def rm(self, path, recursive=False):
+        local = self.local(path)
+        if recursive and os.path.isdir(local):
+            await _thread(shutil.rmtree, local)
+        else:
+            await _thread(os.remove, local)
+
+    async def copy(self, src, dest, recursive=False):
+        local_src, local_dest = self.local(src), self.local(dest)
+        if os.path.isdir(local_src):
+            if not recursive:
+                raise IsADirectoryError(f"{src} is a directory, use recursive=True")
+            await _thread(shutil.copytree, local_src, local_dest, dirs_exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(local_dest), exist_ok=True)
+            await _thread(shutil.copyfile, local_src, local_dest)
+
+
+class CloudAsyncFS(AsyncFS):
+    def __init__(self):
+        """Filesystem for local and cloud paths through hailtop's RouterAsyncFS.
+
+        Runs in-process and reuses its HTTP connections across calls.
+        """
+        from hailtop.aiotools.router_fs import RouterAsyncFS
+        self.fs = RouterAsyncFS('file')
+
+    async def exists(self, path):
+        return(await self.fs.isfile(path) or await self.fs.isdir(path))
+
+    async def ls(self, path):
+        if await self.fs.isfile(path):
+            return([path])
+        if not await self.fs.isdir(path):
+            return([])
+        urls = []
+        async for entry in await self.fs.listfiles(path):
+            url = await entry.url()
+            if await entry.is_dir() and not url.endswith('/'):
+                url += '/'
+            urls.append(url)
+        return(sorted(urls))
+
+    async def stat(self, path):
+        status = await self.fs.statfile(path)
+        try:
+            mtime = (await status.time_modified()).timestamp()
+        except (AttributeError, NotImplementedError, ValueError):
+            mtime = None
+        return({'path': path, 'size': await status.size(), 'mtime': mtime,
+                'generation': self._item(status, 'generation'),
+                'crc32c': self._item(status, 'crc32c'),
+                'md5': self._item(status, 'md5Hash')})
+
+    @staticmethod
+    def _item(status, key):
+        try:
+            return(status[key])
+        except (KeyError, TypeError, NotImplementedError):
+            return(None)
+
+    async def rm(self, path, recursive=False):
+        if recursive and await self.fs.isdir(path):
+            await self.fs.rmtree(None, path)
+        else:
+            await self.fs.remove(path)
+
+    async def copy(self, src, dest, recursive=False):
+        if await self.fs.isfile(src):
+            await self._copy_file(src, dest)
+            return
+        if not recursive:
+            raise IsADirectoryError(f"{src} is a directory, use recursive=True")
+        prefix = src.rstrip('/') + '/'
+        srcs = [await entry.url() async for entry in await self.fs.listfiles(prefix, recursive=True)]
+        sema = asyncio.Semaphore(PARALLELISM)
+
+        async def copy_one(url):
+            async with sema:
+                await self._copy_file(url, os.path.join(dest, url[len(prefix):]))
+        await asyncio.gather(*[copy_one(url) for url in srcs])
+
+    async def _copy_file(self, src, dest):
+        async with await self.fs.open(src) as reader:
+            async with await self.fs.create(dest) as writer:
+                while True:
+                    chunk = await reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await writer.write(chunk)
+
+    async def close(self):
+        await self.fs.close()
+
+
+class GsutilAsyncFS(AsyncFS):
+    """Filesystem calling the gsutil command line tool, one process per call.
+
+    Used only when hailtop is not installed.
+    """
+
+    async def gsutil(self, *args):
+        p = await asyncio.create_subprocess_exec(
+            'gsutil', *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        output, error = await p.communicate()
+        return(p.returncode, output.decode().strip(), error.decode().strip())
+
+    async def exists(self, path):
+        returncode, output, error = await self.gsutil('ls', path)
+        return(returncode == 0)
+
+    async def ls(self, path):
+        returncode, output, error = await self.gsutil('ls', path)
+        return(output.split('\n') if returncode == 0 and output else [])
+
+    async def stat(self, path):
+        returncode, output, error = await self.gsutil('stat', path)
+        if returncode != 0:
+            raise FileNotFoundError(path)
+        fields = dict(re.findall(r'^\s*(.+?):\s+(.*)$', output, flags=re.M))
+        return({'path': path, 'size': int(fields['Content-Length']), 'mtime': None,
+                'generation': fields.get('Generation'), 'crc32c': fields.get('Hash (crc32c)'),
+                'md5': fields.get('Hash (md5)')})
+
+    async def rm(self, path, recursive=False):
+        args = ['-m', 'rm'] + (['-r'] if recursive else []) + [path]
+        returncode, output, error = await self.gsutil(*args)
+        if returncode != 0:
+            raise OSError(error)
+
+    async def copy(self, src, dest, recursive=False):
+        args = ['-m', 'cp'] + (['-r'] if recursive else []) + [src, dest]
+        returncode, output, error = await self.gsutil(*args)
+        if returncode != 0:
+            raise OSError(error)
+
+
+_fs = None
+_fs_is_default = False
+_loop = None
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """Forget the parent's event loop in a forked child.
+
+    The loop thread does not exist in the child, so waiting on it would block
+    forever. Filesystems created by `get_fs` hold connections bound to that
+    loop and are dropped too; one set with `set_fs` is kept.
+    """
+    global _fs, _fs_is_default, _loop, _lock
+    _loop = None
+    _lock = threading.Lock()
+    if _fs_is_default:
+        _fs, _fs_is_default = None, False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def run(coro):
+    """Run a coroutine on the background event loop shared by all fs calls.
+
+    A single long-lived loop lets filesystems keep their connections open
+    between calls, and works from inside notebooks that already run a loop.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='datatracker-fs', daemon=True).start()
+    return(asyncio.run_coroutine_threadsafe(coro, _loop).result())
+
+
+async def _default_fs():
+    try:
+        return(CloudAsyncFS())
+    except ImportError:
+        logger.debug('hailtop is not installed, falling back to gsutil')
+        return(GsutilAsyncFS())
+
+
+def get_fs():
+    """Return the filesystem used by the cloud helpers, creating it on first use."""
+    global _fs, _fs_is_default
+    if _fs is None:
+        _fs, _fs_is_default = run(_default_fs()), True
+    return(_fs)
+
+
+def set_fs(fs):
+    """Replace the filesystem used by the cloud helpers.
+
+    Examples
+    --------
+    >>> set_fs(LocalAsyncFS(root='/tmp/buckets'))
+    """
+    global _fs, _fs_is_default
+    _fs, _fs_is_default = fs, False
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import zlib
+import subprocess
+from logzero import logger
+
+_describe_cache = {}
+_dirty_cache = {}
+
+
+def find_git_dir(path=None):
+    """Locate the .git directory of the repository containing path.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory to start from, by default the working directory
+
+    Returns
+    -------
+    str or None
+        Path to the git directory, following `gitdir:` files of worktrees
+    """
+    path = os.path.abspath(path or os.getcwd())
+    while True:
+        candidate = os.path.join(path, '.git')
+        if os.path.isdir(candidate):
+            return(candidate)
+        if os.path.isfile(candidate):
+            with open(candidate) as f:
+                content = f.read().strip()
+            if content.startswith('gitdir:'):
+                return(os.path.normpath(os.path.join(path, content[len('gitdir:'):].strip())))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return(None)
+        path = parent
+
+
+def _common_dir(git_dir):
+    commondir = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir):
+        with open(commondir) as f:
+            return(os.path.normpath(os.path.join(git_dir, f.read().strip())))
+    return(git_dir)
+
+
+def _packed_refs(git_dir):
+    """Map ref names to (sha, peeled sha) from packed-refs."""
+    refs = {}
+    path = os.path.join(_common_dir(git_dir), 'packed-refs')
+    if not os.path.isfile(path):
+        return(refs)
+    last = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('^') and last is not None:
+                refs[last] = (refs[last][0], line[1:])
+                continue
+            sha, last = line.split(' ', 1)
+            refs[last] = (sha, None)
+    return(refs)
+
+
+def resolve_ref(git_dir, ref):
+    """Commit sha a ref points to, read from loose refs or packed-refs."""
+    for base in dict.fromkeys([git_dir, _common_dir(git_dir)]):
+        loose = os.path.join(base, ref)
+        if os.path.isfile(loose):
+            with open(loose) as f:
+                content = f.read().strip()
+            if content.startswith('ref:'):
+                return(resolve_ref(git_dir, content[4:].strip()))
+            return(content)
+    packed = _packed_refs(git_dir).get(ref)
+    return(packed[0] if packed else None)
+
+
+def head(git_dir):
+    """Commit sha of HEAD, without running git."""
+    with open(os.path.join(git_dir, 'HEAD')) as f:
+        content = f.read().strip()
+    if content.startswith('ref:'):
+        return(resolve_ref(git_dir, content[4:].strip()))
+    return(content)
+
+
+def _tags_stamp(git_dir):
+    common = _common_dir(git_dir)
+    stamp = []
+    for path in [os.path.join(common, 'packed-refs'), os.path.join(common, 'refs', 'tags')]:
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            stamp.append(None)
+    return(tuple(stamp))
+
+
+def _annotated_target(git_dir, sha):
+    """Commit an annotated tag object points to, if stored as a loose object."""
+    path = os.path.join(_common_dir(git_dir), 'objects', sha[:2], sha[2:])
+    if not os.path.isfile(path):
+        return(None)
+    with open(path, 'rb') as f:
+        data = zlib.decompress(f.read())
+    header, _, body = data.partition(b'\0')
+    if not header.startswith(b'tag '):
+        return(None)
+    first = body.split(b'\n', 1)[0]
+    return(first[len(b'object '):].decode() if first.startswith(b'object ') else None)
+
+
+def exact_tag(git_dir, sha):
+    """Name of the single annotated tag pointing at sha, read from .git.
+
+    Returns None when there is no such tag, several candidates, or tags that
+    cannot be peeled without git, so the caller can fall back to git describe.
+    """
+    tags = set()
+    for ref, (tag_sha, peeled) in _packed_refs(git_dir).items():
+        if ref.startswith('refs/tags/') and peeled == sha:
+            tags.add(ref[len('refs/tags/'):])
+    tags_dir = os.path.join(_common_dir(git_dir), 'refs', 'tags')
+    for root, dirs, files in os.walk(tags_dir):
+        for name in files:
+            with open(os.path.join(root, name)) as f:
+                tag_sha = f.read().strip()
+            target = _annotated_target(git_dir, tag_sha)
+            if target is None and tag_sha != sha:
+                continue
+            if target is None:
+                # lightweight tag, or a packed tag object we cannot peel
+                return(None)
+            if target == sha:
+                tags.add(os.path.relpath(os.path.join(root, name), tags_dir))
+    return(tags.pop() if len(tags) == 1 else None)
+
+
+def describe(path=None):
+    """`git describe` of the repository, cached per process and HEAD.
+
+    The cache key includes HEAD's commit and the state of the tag refs, so
+    checking out another commit or adding a tag invalidates it. When HEAD is
+    exactly at one annotated tag the name is read from .git without running
+    git. Returns '' outside a repository, like `git describe` output.
+    """
+    git_dir = find_git_dir(path)
+    if git_dir is None:
+        return('')
+    sha = head(git_dir)
+    key = (git_dir, sha, _tags_stamp(git_dir))
+    if key not in _describe_cache:
+        version = exact_tag(git_dir, sha) if sha else None
+        if version is None:
+            version = subprocess.run(['git', 'describe'], capture_output=True,
+                                     cwd=path).stdout.strip().decode()
+        _describe_cache[key] = version
+    return(_describe_cache[key])
+
+
+def is_dirty(path=None):
+    """Whether tracked files have uncommitted changes, cached per process and HEAD.
+
+    Like `describe`, the flag describes the code the process runs, so it is
+    resolved once per HEAD commit; edits made to the working tree later in
+    the same process are not picked up. Returns None outside a repository.
+    """
+    git_dir = find_git_dir(path)
+    if git_dir is None:
+        return(None)
+    key = (git_dir, head(git_dir))
+    if key not in _dirty_cache:
+        p = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                           capture_output=True, cwd=path)
+        _dirty_cache[key] = bool(p.stdout.strip()) if p.returncode == 0 else None
+    return(_dirty_cache[key])
+
+
+def git_info(path=None, dirty=True):
+    """Commit hash and dirty flag of the repository containing path.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory inside the repository, by default the working directory
+    dirty : bool, optional
+        Run `git status` to check for uncommitted changes, by default True;
+        otherwise the flag is None and no git process is started
+    """
+    git_dir = find_git_dir(path)
+    if git_dir is None:
+        return({'git_hash': None, 'dirty': None})
+    return({'git_hash': head(git_dir), 'dirty': is_dirty(path) if dirty else None})
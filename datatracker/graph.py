@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import heapq
+from collections import Counter, defaultdict, deque
+from logzero import logger
+
+
+class LineageGraph():
+    def __init__(self, documents=None):
+        """Dependency graph between entries, linked through their files.
+
+        Entry nodes are tags; file nodes are paths. An input file links its
+        entry to an upstream tag when it names the upstream `entry_tag`, or
+        when its path is an output file of an upstream entry. Edges are
+        reference counted per document, so adding or removing one document
+        only touches the edges of its own files. The graph covers whichever
+        documents it is given; `Tracker.graph` gives it the most recent
+        version of each tag.
+
+        Parameters
+        ----------
+        documents : dict, optional
+            Documents keyed by document id, by default None
+
+        Examples
+        --------
+        >>> graph = tr.graph()
+        >>> graph.upstream('entry_tag')
+        >>> graph.topological_order()
+        """
+        self.doc_tags = {}
+        self.producers = defaultdict(set)
+        self.consumers = defaultdict(set)
+        self.children = defaultdict(dict)
+        self.parents = defaultdict(dict)
+        self.nodes = Counter()
+        if documents is not None:
+            for doc_id, doc in documents.items():
+                self.add(doc_id, doc)
+
+    def add(self, doc_id, doc):
+        tag = doc['tag']
+        self.doc_tags[doc_id] = tag
+        self.nodes[tag] += 1
+        for path in self._paths(doc.get('output_files')):
+            for consumer in self.consumers.get(path, ()):
+                self._edge(tag, self.doc_tags[consumer], 1)
+            self.producers[path].add(doc_id)
+        for upstream in self._upstream_tags(doc):
+            self._edge(upstream, tag, 1)
+        for path in self._paths(doc.get('input_files')):
+            self.consumers[path].add(doc_id)
+
+    def discard(self, doc_id, doc):
+        tag = self.doc_tags.get(doc_id)
+        if tag is None:
+            return
+        for path in self._paths(doc.get('input_files')):
+            self._discard_key(self.consumers, path, doc_id)
+        for upstream in self._upstream_tags(doc):
+            self._edge(upstream, tag, -1)
+        for path in self._paths(doc.get('output_files')):
+            self._discard_key(self.producers, path, doc_id)
+            for consumer in self.consumers.get(path, ()):
+                self._edge(tag, self.doc_tags[consumer], -1)
+        del self.doc_tags[doc_id]
+        self.nodes[tag] -= 1
+        if not self.nodes[tag]:
+            del self.nodes[tag]
+
+    def _upstream_tags(self, doc):
+        """Upstream tags of a document's inputs, once per entry_tag and producing document."""
+        for file in doc.get('input_files') or []:
+            if file.get('entry_tag'):
+                yield file['entry_tag']
+        for path in self._paths(doc.get('input_files')):
+            for producer in self.producers.get(path, ()):
+                yield self.doc_tags[producer]
+
+    @staticmethod
+    def _paths(files):
+        return(dict.fromkeys(f['path'] for f in files or [] if f.get('path')))
+
+    def _edge(self, upstream, downstream, count):
+        if upstream == downstream:
+            return
+        children = self.children[upstream]
+        children[downstream] = children.get(downstream, 0) + count
+        self.parents[downstream][upstream] = children[downstream]
+        if not children[downstream]:
+            del children[downstream]
+            del self.parents[downstream][upstream]
+            for mapping, key in ((self.children, upstream), (self.parents, downstream)):
+                if not mapping[key]:
+                    del mapping[key]
+
+    @staticmethod
+    def _discard_key(mapping, key, doc_id):
+        ids = mapping.get(key)
+        if ids is None:
+            return
+        ids.discard(doc_id)
+        if not ids:
+            del mapping[key]
+
+    def _walk(self, tags, edges):
+        if isinstance(tags, str):
+            tags = [tags]
+        seen = set()
+        queue = deque(tags)
+        while queue:
+            for other in edges.get(queue.popleft(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        return(seen)
+
+    def upstream(self, tags):
+        """Tags the given tag or tags depend on, directly or transitively."""
+        return(self._walk(tags, self.parents))
+
+    def downstream(self, tags):
+        """Tags depending on the given tag or tags, directly or transitively."""
+        return(self._walk(tags, self.children))
+
+    def topological_order(self, tags=None):
+        """Tags ordered so every tag comes after the tags it depends on.
+
+        Ties are broken alphabetically, so the order is stable.
+
+        Parameters
+        ----------
+        tags : iterable, optional
+            Order only these tags, by default every tag in the graph
+
+        Raises
+        ------
+        ValueError
+            If the tags depend on each other in a cycle
+        """
+        tags = set(self.nodes) | set(self.children) | set(self.parents) if tags is None else set(tags)
+        degree = {tag: sum(1 for p in self.parents.get(tag, ()) if p in tags) for tag in tags}
+        ready = [tag for tag, d in degree.items() if not d]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            tag = heapq.heappop(ready)
+            order.append(tag)
+            for child in self.children.get(tag, ()):
+                if child in degree:
+                    degree[child] -= 1
+                    if not degree[child]:
+                        heapq.heappush(ready, child)
+        if len(order) < len(tags):
+            cycle = sorted(tag for tag, d in degree.items() if d)
+            raise ValueError(f"Entries depend on each other in a cycle: {cycle}")
+        return(order)
+
+    def __contains__(self, tag):
+        return(tag in self.nodes or tag in self.children or tag in self.parents)
+
+    def __len__(self):
+        return(len(set(self.nodes) | set(self.children) | set(self.parents)))
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import copy
+import math
+import bisect
+from collections import defaultdict
+from logzero import logger
+from tinydb.table import Document
+from .graph import LineageGraph
+
+LINEAGE_FIELDS = ('tag', 'input_files', 'output_files')
+FILE_FIELDS = ('input_files', 'output_files')
+
+
+def copy_document(doc):
+    """Copy of a document that shares none of its file records.
+
+    Cheaper than a deep copy: only the input and output file lists and
+    their records are copied, the other values are immutable.
+    """
+    return(_copy_files(dict(doc)))
+
+
+def _copy_files(doc):
+    for field in FILE_FIELDS:
+        if isinstance(doc.get(field), list):
+            doc[field] = [dict(f) for f in doc[field]]
+    return(doc)
+
+
+class TrackerIndex():
+    def __init__(self, documents=None):
+        """In-memory index over tracker documents, keyed by document id.
+
+        Parameters
+        ----------
+        documents : list, optional
+            TinyDB documents to index, by default None
+        """
+        self.docs = {}
+        self.tags = defaultdict(set)
+        self.tag_versions = defaultdict(set)
+        self.versions_by_tag = defaultdict(set)
+        self.most_recent = defaultdict(set)
+        self.output_files = {}
+        self._values = {}
+        self._sorted = {}
+        self._lineage = None
+        self._paths = None
+        self._outdated = None
+        self._recheck = set()
+        if documents is not None:
+            for doc in documents:
+                self.add(doc.doc_id, doc)
+
+    def add(self, doc_id, doc):
+        self.docs[doc_id] = copy_document(doc)
+        self._link(doc_id, self.docs[doc_id])
+        if self._lineage is not None and doc.get('most_recent'):
+            self._lineage.add(doc_id, self.docs[doc_id])
+        if self._paths is not None:
+            self._paths.add(doc_id, self.docs[doc_id])
+        self._touch(doc['tag'])
+
+    def discard(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._touch(doc['tag'])
+        self._unlink(doc_id, doc)
+        if self._lineage is not None:
+            self._lineage.discard(doc_id, doc)
+        if self._paths is not None:
+            self._paths.discard(doc_id, doc)
+
+    def update(self, doc_id, fields):
+        doc = self.docs[doc_id]
+        paths = not fields.keys().isdisjoint(LINEAGE_FIELDS) and self._paths is not None
+        lineage = (not fields.keys().isdisjoint(LINEAGE_FIELDS + ('most_recent',))
+                   and self._lineage is not None)
+        self._touch(doc['tag'])
+        self._unlink(doc_id, doc)
+        if paths:
+            self._paths.discard(doc_id, doc)
+        if lineage:
+            self._lineage.discard(doc_id, doc)
+        doc.update(copy.deepcopy(fields))
+        self._link(doc_id, doc)
+        if paths:
+            self._paths.add(doc_id, doc)
+        if lineage and doc.get('most_recent'):
+            self._lineage.add(doc_id, doc)
+        self._touch(doc['tag'])
+
+    def _touch(self, tag):
+        """Queue a tag and the tags reading from it for a staleness recheck."""
+        if self._outdated is None:
+            return
+        self._recheck.add(tag)
+        self._recheck.update(self._lineage.children.get(tag, ()))
+
+    def document(self, doc_id):
+        """Copy of an indexed document, safe for the caller to modify."""
+        return(_copy_files(Document(self.docs[doc_id], doc_id)))
+
+    @property
+    def lineage(self):
+        """Lineage graph of the most recent documents, built on first use.
+
+        Superseded versions are left out, so the graph only holds dependencies
+        that a current entry has. It follows most_recent relabelling.
+        """
+        if self._lineage is None:
+            self._lineage = LineageGraph({doc_id: doc for doc_id, doc in self.docs.items()
+                                          if doc.get('most_recent')})
+        return(self._lineage)
+
+    def outdated(self):
+        """Tags whose most recent entry has newer inputs than it was run on.
+
+        Every tag with upstream links is checked on the first call; later calls
+        only recheck tags whose entries, or whose upstream entries, changed.
+        """
+        graph = self.lineage
+        if self._outdated is None:
+            self._outdated, self._recheck = set(), set(graph.parents)
+        for tag in self._recheck:
+            doc_id = self.entry_id(tag)
+            if tag in graph.parents and doc_id is not None and self.has_newer_inputs(self.docs[doc_id]):
+                self._outdated.add(tag)
+            else:
+                self._outdated.discard(tag)
+        self._recheck = set()
+        return(set(self._outdated))
+
+    def has_newer_inputs(self, doc):
+        """Whether an upstream entry of a document changed after it was saved."""
+        producers = self.lineage.producers
+        for file in doc.get('input_files') or []:
+            upstream = self.entry_id(file['entry_tag']) if file.get('entry_tag') else None
+            if (upstream is not None and file.get('version') is not None
+                    and self.docs[upstream]['version'] != file['version']):
+                return(True)
+            for doc_id in producers.get(file.get('path'), ()):
+                producer = self.docs[doc_id]
+                if (producer['tag'] != doc['tag'] and producer.get('most_recent')
+                        and producer['time'] > doc['time']):
+                    return(True)
+        return(False)
+
+    @property
+    def paths(self):
+        """Index from output file path to the documents that wrote it, built on first use."""
+        if self._paths is None:
+            self._paths = PathIndex(self.docs)
+        return(self._paths)
+
+    def _link(self, doc_id, doc):
+        self.tags[doc['tag']].add(doc_id)
+        self.tag_versions[doc['tag_version']].add(doc_id)
+        self.versions_by_tag[(doc['tag'], doc['version'])].add(doc_id)
+        if doc.get('most_recent'):
+            self.most_recent[doc['tag']].add(doc_id)
+        files = {}
+        for file in doc.get('output_files', []):
+            files.setdefault(file['tag'], file)
+        self.output_files[doc_id] = files
+        for field, mapping in self._values.items():
+            if field in doc:
+                mapping[doc[field]].add(doc_id)
+        for field, pairs in self._sorted.items():
+            if self._is_number(doc.get(field)):
+                bisect.insort(pairs, (doc[field], doc_id))
+
+    def _unlink(self, doc_id, doc):
+        self._discard_key(self.tags, doc['tag'], doc_id)
+        self._discard_key(self.tag_versions, doc['tag_version'], doc_id)
+        self._discard_key(self.versions_by_tag, (doc['tag'], doc['version']), doc_id)
+        self._discard_key(self.most_recent, doc['tag'], doc_id)
+        self.output_files.pop(doc_id, None)
+        for field, mapping in self._values.items():
+            if field in doc:
+                self._discard_key(mapping, doc[field], doc_id)
+        for field, pairs in self._sorted.items():
+            if self._is_number(doc.get(field)):
+                del pairs[bisect.bisect_left(pairs, (doc[field], doc_id))]
+
+    def values(self, field):
+        """Map each value of a field to the ids of documents holding it.
+
+        Built on first use for fields other than tag and tag_version, then
+        kept up to date. Documents without the field are left out.
+        """
+        if field == 'tag':
+            return(self.tags)
+        if field == 'tag_version':
+            return(self.tag_versions)
+        if field not in self._values:
+            mapping = defaultdict(set)
+            for doc_id, doc in self.docs.items():
+                if field in doc:
+                    mapping[doc[field]].add(doc_id)
+            self._values[field] = mapping
+        return(self._values[field])
+
+    def sorted_values(self, field):
+        """Sorted (value, doc_id) pairs of a numeric field, built on first use."""
+        if field not in self._sorted:
+            self._sorted[field] = sorted((doc[field], doc_id) for doc_id, doc in self.docs.items()
+                                         if self._is_number(doc.get(field)))
+        return(self._sorted[field])
+
+    def value_range(self, field, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        """Ids of documents whose numeric field lies between low and high."""
+        pairs = self.sorted_values(field)
+        start, end = 0, len(pairs)
+        if low is not None:
+            start = (bisect.bisect_left if low_inclusive else bisect.bisect_right)(
+                pairs, (low, -math.inf if low_inclusive else math.inf))
+        if high is not None:
+            end = (bisect.bisect_right if high_inclusive else bisect.bisect_left)(
+                pairs, (high, math.inf if high_inclusive else -math.inf))
+        return({doc_id for _, doc_id in pairs[start:end]})
+
+    @staticmethod
+    def _is_number(value):
+        # NaN compares false to everything, so it cannot be placed in order
+        return(isinstance(value, (int, float)) and not isinstance(value, bool) and value == value)
+
+    @staticmethod
+    def _discard_key(mapping, key, doc_id):
+        ids = mapping.get(key)
+        if ids is None:
+            return
+        ids.discard(doc_id)
+        if not ids:
+            del mapping[key]
+
+    def versions(self, tag):
+        """Map document ids of a tag to their version."""
+        return({doc_id: self.docs[doc_id]['version'] for doc_id in self.tags.get(tag, ())})
+
+    def duplicates(self, tag_version):
+        """Document ids already stored under a tag_version."""
+        return(set(self.tag_versions.get(tag_version, ())))
+
+    def entry_id(self, tag, version=None):
+        """Document id of a tag's given version, or of its most recent one.
+
+        Returns None if there is no such entry.
+        """
+        if version is not None:
+            ids = self.versions_by_tag.get((tag, version))
+        else:
+            ids = self.most_recent.get(tag)
+        return(min(ids) if ids else None)
+
+    def output_file(self, doc_id, file_tag):
+        """First output file of a document with the given tag, or None."""
+        return(self.output_files[doc_id].get(file_tag))
+
+    def __len__(self):
+        return(len(self.docs))
+
+    def __contains__(self, doc_id):
+        return(doc_id in self.docs)
+
+
+class PathIndex():
+    def __init__(self, documents=None):
+        """Index from output file paths to the documents and file tags that wrote them.
+
+        Paths are also kept in a sorted list, so a path or every path under a
+        prefix is found by bisection.
+
+        Parameters
+        ----------
+        documents : dict, optional
+            Documents keyed by document id, by default None
+        """
+        self.files = defaultdict(set)
+        if documents is not None:
+            for doc_id, doc in documents.items():
+                for file in doc.get('output_files') or []:
+                    if file.get('path'):
+                        self.files[file['path']].add((doc_id, file.get('tag')))
+        self.sorted_paths = sorted(self.files)
+
+    def add(self, doc_id, doc):
+        for file in doc.get('output_files') or []:
+            path = file.get('path')
+            if not path:
+                continue
+            if path not in self.files:
+                bisect.insort(self.sorted_paths, path)
+            self.files[path].add((doc_id, file.get('tag')))
+
+    def discard(self, doc_id, doc):
+        for file in doc.get('output_files') or []:
+            path = file.get('path')
+            writers = self.files.get(path)
+            if writers is None:
+                continue
+            writers.discard((doc_id, file.get('tag')))
+            if not writers:
+                del self.files[path]
+                del self.sorted_paths[bisect.bisect_left(self.sorted_paths, path)]
+
+    def get(self, path):
+        """(doc_id, file tag) pairs that wrote a path."""
+        return(self.files.get(path, set()))
+
+    def under(self, prefix):
+        """Indexed paths starting with prefix, in sorted order."""
+        paths = self.sorted_paths
+        start = end = bisect.bisect_left(paths, prefix)
+        while end < len(paths) and paths[end].startswith(prefix):
+            end += 1
+        return(paths[start:end])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import fcntl
+import random
+import threading
+from logzero import logger
+
+
+class FileLock():
+    def __init__(self, path, timeout=60, delay=0.01, max_delay=0.5):
+        """Reentrant inter-process lock on a file, using flock.
+
+        Acquisition is non-blocking and retried with jittered exponential
+        backoff until `timeout`, so a stuck writer surfaces as an error instead
+        of hanging every pipeline. flock is held per open file, not per thread,
+        so threads of one process first take a reentrant thread lock; only
+        the thread holding it re-enters.
+
+        Parameters
+        ----------
+        path : str
+            Path to the lock file, created if missing
+        timeout : float, optional
+            Seconds to keep retrying before giving up, by default 60
+        delay : float, optional
+            Initial retry delay in seconds, by default 0.01
+        max_delay : float, optional
+            Upper bound on the retry delay in seconds, by default 0.5
+        """
+        self.path = path
+        self.timeout = timeout
+        self.delay = delay
+        self.max_delay = max_delay
+        self.handle = None
+        self.depth = 0
+        self.owner = None
+        self.thread_lock = threading.RLock()
+
+    def acquire(self):
+        start = time.monotonic()
+        if not self.thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Could not lock {self.path} within {self.timeout}s")
+        if self.depth:
+            self.depth += 1
+            return
+        try:
+            handle = open(self.path, 'a')
+            delay = self.delay
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() - start > self.timeout:
+                        handle.close()
+                        raise TimeoutError(f"Could not lock {self.path} within {self.timeout}s")
+                    time.sleep(delay * (1 + random.random()))
+                    delay = min(delay * 2, self.max_delay)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        self.handle = handle
+        self.depth = 1
+        self.owner = threading.get_ident()
+
+    def release(self):
+        self.depth -= 1
+        if not self.depth:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+            self.owner = None
+        self.thread_lock.release()
+
+    @property
+    def locked(self):
+        """Whether the calling thread holds the lock."""
+        return(self.depth > 0 and self.owner == threading.get_ident())
+
+    def __enter__(self):
+        self.acquire()
+        return(self)
+
+    def __exit__(self, *args):
+        self.release()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import bisect
+import functools
+from collections import defaultdict
+from logzero import logger
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1, 10, float('inf'))
+
+
+class Metrics():
+    def __init__(self, enabled=False):
+        """Call counts, latencies and counters of tracker operations.
+
+        When disabled, instrumented methods only pay for checking `enabled`.
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            Whether to record anything, by default False
+        """
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.calls = defaultdict(int)
+        self.total = defaultdict(float)
+        self.max = defaultdict(float)
+        self.histograms = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.counters = defaultdict(lambda: defaultdict(int))
+
+    def record(self, op, seconds):
+        self.calls[op] += 1
+        self.total[op] += seconds
+        self.max[op] = max(self.max[op], seconds)
+        self.histograms[op][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def count(self, op, name, n=1):
+        """Add to a counter of an operation, e.g. documents scanned."""
+        if self.enabled:
+            self.counters[op][name] += n
+
+    def stats(self):
+        """Per operation calls, total/mean/max seconds, latency histogram and counters."""
+        stats = {}
+        for op in sorted(set(self.calls) | set(self.counters)):
+            calls = self.calls.get(op, 0)
+            stats[op] = {
+                'calls': calls,
+                'total_time': self.total.get(op, 0.0),
+                'mean_time': self.total.get(op, 0.0) / calls if calls else None,
+                'max_time': self.max.get(op, 0.0),
+                'histogram': {f"<={bound:g}s": n for bound, n in zip(
+                    LATENCY_BUCKETS, self.histograms[op]) if n} if op in self.histograms else {},
+                **self.counters.get(op, {})}
+        return(stats)
+
+
+def timed(op):
+    """Decorate a Tracker method to record its latency in `self.metrics`."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if not metrics.enabled:
+                return(method(self, *args, **kwargs))
+            start = time.perf_counter()
+            try:
+                return(method(self, *args, **kwargs))
+            finally:
+                metrics.record(op, time.perf_counter() - start)
+        return(wrapper)
+    return(decorate)
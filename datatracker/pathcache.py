@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import threading
+from logzero import logger
+from .fs import get_fs, run as fs_run
+from .utils import PARALLELISM, is_cloud_path, paths_exist
+
+PATH_TTL = 3600
+
+PATHCACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    path TEXT PRIMARY KEY,
+    exists_ INTEGER NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    generation TEXT,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checksums (
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    PRIMARY KEY (path, size, mtime_ns)
+);
+"""
+
+
+class PathCache():
+    def __init__(self, path, ttl=PATH_TTL):
+        """Persistent cache of cloud path existence and metadata.
+
+        Records are kept in a small SQLite file, usually next to the tracker,
+        so they are shared across scripts and sessions. A record is trusted for
+        `ttl` seconds after it was checked; local paths are always checked
+        directly since that is cheap.
+
+        Parameters
+        ----------
+        path : str
+            Path to the cache file
+        ttl : float, optional
+            Seconds a record stays fresh, by default 3600
+
+        Examples
+        --------
+        >>> cache = PathCache('tracker.json.paths.sqlite', ttl=600)
+        >>> cache.exists('gs://bucket/file.bed')
+        """
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        """SQLite connection of the calling thread, opened on first use so unused caches leave no file."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, isolation_level=None, timeout=60)
+            conn.executescript(PATHCACHE_SCHEMA)
+        return(conn)
+
+    def get(self, path):
+        """Fresh record for a path, or None if missing or expired."""
+        return(self._fresh([path]).get(path))
+
+    def _fresh(self, paths):
+        records = {}
+        if not paths:
+            return(records)
+        cutoff = time.time() - self.ttl
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            rows = self.conn.execute(
+                'SELECT path, exists_, size, mtime, generation, checked_at FROM paths '
+                f'WHERE checked_at >= ? AND path IN ({",".join("?" * len(chunk))})',
+                [cutoff] + chunk)
+            for path, exists, size, mtime, generation, checked_at in rows:
+                records[path] = {'path': path, 'exists': bool(exists), 'size': size, 'mtime': mtime,
+                                 'generation': generation, 'checked_at': checked_at}
+        return(records)
+
+    def put(self, path, exists, stat=None):
+        stat = stat or {}
+        self.conn.execute(
+            'INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?, ?, ?)',
+            (path, int(exists), stat.get('size'), stat.get('mtime'),
+             None if stat.get('generation') is None else str(stat['generation']), time.time()))
+
+    def exists(self, path):
+        return(self.exists_many([path])[path])
+
+    def exists_many(self, paths, parallelism=PARALLELISM, fresh=False):
+        """Check many paths, only going to storage for cloud paths without a fresh record.
+
+        Parameters
+        ----------
+        paths : list
+            Local or cloud paths
+        parallelism : int, optional
+            Maximum number of cloud checks in flight, by default 150
+        fresh : bool, optional
+            Check every cloud path in storage and refresh its record, by
+            default False
+
+        Returns
+        -------
+        dict
+            Path to existence
+        """
+        paths = list(dict.fromkeys(paths))
+        cached = {} if fresh else self._fresh([p for p in paths if is_cloud_path(p)])
+        exists = paths_exist([p for p in paths if p not in cached], parallelism=parallelism)
+        checked = [(p, e) for p, e in exists.items() if is_cloud_path(p)]
+        if checked:
+            self.conn.execute('BEGIN')
+            for p, e in checked:
+                self.put(p, e)
+            self.conn.execute('COMMIT')
+        exists.update({p: record['exists'] for p, record in cached.items()})
+        return(exists)
+
+    def stat(self, path):
+        """Size, mtime and generation of a path, from the cache while fresh.
+
+        Raises FileNotFoundError if the path does not exist.
+        """
+        if not is_cloud_path(path):
+            return(self._local_stat(path))
+        record = self.get(path)
+        if record is not None and not record['exists']:
+            raise FileNotFoundError(path)
+        if record is not None and record['size'] is not None:
+            return(record)
+        try:
+            stat = fs_run(get_fs().stat(path))
+        except FileNotFoundError:
+            self.put(path, False)
+            raise
+        self.put(path, True, stat)
+        return(stat)
+
+    def stat_many(self, paths, parallelism=PARALLELISM, fresh=False):
+        """Stat many paths, fetching cloud paths without a fresh record concurrently.
+
+        Parameters
+        ----------
+        paths : list
+            Local or cloud paths
+        parallelism : int, optional
+            Maximum number of cloud stats in flight, by default 150
+        fresh : bool, optional
+            Stat every cloud path in storage and refresh its record, by
+            default False
+
+        Returns
+        -------
+        dict
+            Path to its stat, or None if it does not exist
+        """
+        paths = list(dict.fromkeys(paths))
+        stats = {}
+        for path in paths:
+            if not is_cloud_path(path):
+                try:
+                    stats[path] = self._local_stat(path)
+                except OSError:
+                    stats[path] = None
+        cloud = [p for p in paths if is_cloud_path(p)]
+        for path, record in ({} if fresh else self._fresh(cloud)).items():
+            if not record['exists']:
+                stats[path] = None
+            elif record['size'] is not None:
+                stats[path] = record
+        pending = [p for p in cloud if p not in stats]
+        if pending:
+            fetched = fs_run(self._stat_all(get_fs(), pending, parallelism))
+            self.conn.execute('BEGIN')
+            for path, stat in fetched.items():
+                self.put(path, stat is not None, stat)
+            self.conn.execute('COMMIT')
+            stats.update(fetched)
+        return(stats)
+
+    @staticmethod
+    async def _stat_all(fs, paths, parallelism):
+        sema = asyncio.Semaphore(parallelism)
+
+        async def stat(path):
+            async with sema:
+                try:
+                    return(await fs.stat(path))
+                except FileNotFoundError:
+                    return(None)
+        return(dict(zip(paths, await asyncio.gather(*[stat(path) for path in paths]))))
+
+    @staticmethod
+    def _local_stat(path):
+        stat = os.stat(os.path.realpath(os.path.expanduser(path)))
+        return({'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                'generation': stat.st_mtime_ns})
+
+    def get_checksum(self, path, size, mtime_ns):
+        """Checksum recorded for a local file with this exact size and mtime, or None.
+
+        Unlike existence records these never expire, since a changed file
+        has a different size or mtime.
+        """
+        row = self.conn.execute(
+            'SELECT checksum FROM checksums WHERE path = ? AND size = ? AND mtime_ns = ?',
+            (path, size, mtime_ns)).fetchone()
+        return(None if row is None else row[0])
+
+    def put_checksum(self, path, size, mtime_ns, checksum):
+        self.conn.execute('BEGIN')
+        self.conn.execute('DELETE FROM checksums WHERE path = ?', (path,))
+        self.conn.execute('INSERT INTO checksums VALUES (?, ?, ?, ?)', (path, size, mtime_ns, checksum))
+        self.conn.execute('COMMIT')
+
+    def invalidate(self, paths=None, prefix=None):
+        """Forget cached records.
+
+        Parameters
+        ----------
+        paths : list, optional
+            Paths to forget
+        prefix : str, optional
+            Forget every path starting with this prefix
+
+        With neither argument the whole cache is cleared. Only cloud paths are
+        ever cached, so local paths are ignored.
+        """
+        if paths is None and prefix is None:
+            self.conn.execute('DELETE FROM paths')
+            return
+        paths = [p for p in paths or [] if is_cloud_path(p)]
+        if not paths and prefix is None:
+            return
+        self.conn.execute('BEGIN')
+        self.conn.executemany('DELETE FROM paths WHERE path = ?', [(p,) for p in paths])
+        if prefix is not None:
+            self.conn.execute('DELETE FROM paths WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))
+        self.conn.execute('COMMIT')
+
+    def __len__(self):
+        return(self.conn.execute('SELECT count(*) FROM paths').fetchone()[0])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from logzero import logger
+
+EQUALITY_FIELDS = ('tag', 'version', 'tag_version', 'module', 'category', 'most_recent', 'time')
+RANGE_FIELDS = ('time',)
+RANGE_OPERATORS = ('<', '<=', '>', '>=')
+
+
+class QueryPlan():
+    def __init__(self, cond, index):
+        """Plan for answering a TinyDB query from the tracker index.
+
+        Simple tests in the query, i.e. `==` and `one_of` on indexed fields and
+        range comparisons on time, combined with `&` and `|`, select candidate
+        documents from the index. The full query is then evaluated only on the
+        candidates, unless the indexed tests cover it exactly. Anything else
+        falls back to scanning every document.
+
+        Parameters
+        ----------
+        cond : QueryInstance
+            TinyDB query, e.g. `tr.entry.tag == "tag"`
+        index : TrackerIndex
+            Index to select candidates from
+
+        Examples
+        --------
+        >>> print(QueryPlan((q.tag == 'a') & (q.time > 0), tr.index).explain())
+        """
+        self.cond = cond
+        self.index = index
+        self.steps = []
+        self.scanned = None
+        term = getattr(cond, '_hash', None) if getattr(cond, 'is_cacheable', lambda: False)() else None
+        self.candidates, self.exact = (None, False) if term is None else self._compile(term)
+
+    def _compile(self, term):
+        """Candidate ids of a query term and whether they match it exactly.
+
+        Returns (None, False) for terms the index cannot answer.
+        """
+        op = term[0]
+        if op == 'and':
+            parts = [self._compile(t) for t in term[1]]
+            indexed = [p for p in parts if p[0] is not None]
+            if not indexed:
+                return(None, False)
+            ids = set.intersection(*[p[0] for p in indexed])
+            return(ids, len(indexed) == len(parts) and all(p[1] for p in indexed))
+        if op == 'or':
+            parts = [self._compile(t) for t in term[1]]
+            if any(p[0] is None for p in parts):
+                return(None, False)
+            return(set.union(*[p[0] for p in parts]), all(p[1] for p in parts))
+        if len(term) != 3 or not isinstance(term[1], tuple) or len(term[1]) != 1:
+            return(None, False)
+        field, value = term[1][0], term[2]
+        try:
+            if op == '==' and field in EQUALITY_FIELDS:
+                ids = set(self.index.values(field).get(value, ()))
+            elif op == 'one_of' and field in EQUALITY_FIELDS:
+                mapping = self.index.values(field)
+                ids = set().union(*[mapping.get(v, ()) for v in value])
+            elif op in RANGE_OPERATORS and field in RANGE_FIELDS and self.index._is_number(value):
+                bound = {'<': {'high': value, 'high_inclusive': False},
+                         '<=': {'high': value},
+                         '>': {'low': value, 'low_inclusive': False},
+                         '>=': {'low': value}}[op]
+                ids = self.index.value_range(field, **bound)
+            else:
+                return(None, False)
+        except TypeError:
+            # unhashable value
+            return(None, False)
+        self.steps.append(f"index {field} {op} {value!r}: {len(ids)} documents")
+        return(ids, True)
+
+    def run(self):
+        """(doc_id, document) pairs matching the query, in document id order."""
+        docs = self.index.docs
+        if self.candidates is None:
+            ids = docs
+        else:
+            ids = sorted(self.candidates)
+        if self.exact:
+            self.scanned = 0
+            return([(doc_id, docs[doc_id]) for doc_id in ids])
+        self.scanned = len(ids)
+        return([(doc_id, docs[doc_id]) for doc_id in ids if self.cond(docs[doc_id])])
+
+    def explain(self):
+        """Describe how the query is answered."""
+        lines = list(self.steps)
+        if self.candidates is None:
+            lines.append(f"scan: query evaluated on all {len(self.index)} documents")
+        elif self.exact:
+            lines.append('no residual: index lookups match the query exactly')
+        else:
+            lines.append(f"residual: query evaluated on {len(self.candidates)} candidates")
+        return('\n'.join(lines))
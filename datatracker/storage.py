@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import copy
+import json
+import sqlite3
+import tempfile
+from logzero import logger
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage
+
+
+def _cache_tables(data, cache):
+    """Private copy of data to keep as a storage cache.
+
+    Documents equal to the cached ones are reused; the rest are deep copied,
+    so lists a caller still holds never alias the cache.
+    """
+    cache = cache or {}
+    tables = {}
+    for tbl, table in data.items():
+        old = cache.get(tbl, {})
+        tables[tbl] = {doc_id: old[doc_id] if old.get(doc_id) == doc else copy.deepcopy(doc)
+                       for doc_id, doc in table.items()}
+    return(tables)
+
+
+class BatchMiddleware(Middleware):
+    def __init__(self, storage_cls):
+        """TinyDB middleware that holds writes in memory while a batch is open.
+
+        Reads and writes inside `begin`/`commit` go to an in-memory copy of the
+        database, which is written to the wrapped storage once on `commit`.
+        Outside a batch every call is passed straight through.
+
+        Parameters
+        ----------
+        storage_cls : class
+            TinyDB storage class to wrap, e.g. JSONStorage
+        """
+        super().__init__(storage_cls)
+        self.active = False
+        self.loaded = False
+        self.dirty = False
+        self.cache = None
+
+    def begin(self):
+        self.active = True
+
+    def commit(self):
+        if self.dirty:
+            self.storage.write(self.cache)
+        self._reset()
+
+    def discard(self):
+        self._reset()
+
+    def _reset(self):
+        self.active = False
+        self.loaded = False
+        self.dirty = False
+        self.cache = None
+
+    def read(self):
+        if not self.active:
+            return(self.storage.read())
+        if not self.loaded:
+            self.cache = self.storage.read()
+            self.loaded = True
+        return(self.cache)
+
+    def write(self, data):
+        if not self.active:
+            self.storage.write(data)
+            return
+        self.cache = data
+        self.loaded = True
+        self.dirty = True
+
+    def close(self):
+        if self.active:
+            self.commit()
+        self.storage.close()
+
+
+class AtomicJSONStorage(Storage):
+    def __init__(self, path, **kwargs):
+        """TinyDB JSON storage that replaces the file atomically on write.
+
+        The database is written to a temporary file in the same directory,
+        flushed to disk and renamed over the original, so readers never see a
+        half-written file. The file format is the same as TinyDB's JSONStorage.
+
+        The parsed database is kept in memory and only re-read when the file's
+        inode, size or modification time changes. Documents returned by `read`
+        are shallow copies; nested file lists are shared with the cache and
+        must not be modified in place.
+
+        Parameters
+        ----------
+        path : str
+            Path to the JSON database file
+        """
+        self.path = path
+        self.kwargs = kwargs
+        if not os.path.exists(path):
+            open(path, 'a').close()
+        self.cache = None
+        self.seen = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def stamp(self):
+        """Identify the file's current state, which changes on every write."""
+        stat = os.stat(self.path)
+        return((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+
+    def read(self):
+        stamp = self.stamp()
+        if self.cache is None or stamp != self.seen:
+            with open(self.path) as f:
+                text = f.read()
+            self.cache = json.loads(text) if text else {}
+            self.seen = stamp
+            self.bytes_read += stamp[1]
+        if not self.cache:
+            return(None)
+        return({tbl: {doc_id: dict(doc) for doc_id, doc in table.items()}
+                for tbl, table in self.cache.items()})
+
+    def write(self, data):
+        # one dumps call is several times faster than json.dump's chunked writes
+        text = json.dumps(data, **self.kwargs)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tracker-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.chmod(tmp, os.stat(self.path).st_mode & 0o777)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            self.cache = None
+            raise
+        self.cache = _cache_tables(data, self.cache)
+        self.seen = self.stamp()
+        self.bytes_written += self.seen[1]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    tbl TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tag TEXT,
+    version TEXT,
+    tag_version TEXT,
+    most_recent INTEGER,
+    module TEXT,
+    category TEXT,
+    time REAL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (tbl, doc_id)
+);
+CREATE TABLE IF NOT EXISTS input_files (
+    tbl TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    tag TEXT,
+    path TEXT,
+    entry_tag TEXT,
+    version TEXT,
+    PRIMARY KEY (tbl, doc_id, idx)
+);
+CREATE TABLE IF NOT EXISTS output_files (
+    tbl TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    tag TEXT,
+    path TEXT,
+    PRIMARY KEY (tbl, doc_id, idx)
+);
+CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag);
+CREATE INDEX IF NOT EXISTS entries_tag_version ON entries (tag_version);
+CREATE INDEX IF NOT EXISTS entries_most_recent ON entries (most_recent);
+CREATE INDEX IF NOT EXISTS entries_module ON entries (module);
+CREATE INDEX IF NOT EXISTS entries_category ON entries (category);
+CREATE INDEX IF NOT EXISTS input_files_path ON input_files (path);
+CREATE INDEX IF NOT EXISTS input_files_entry_tag ON input_files (entry_tag, tag);
+CREATE INDEX IF NOT EXISTS output_files_path ON output_files (path);
+"""
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path, **kwargs):
+        """TinyDB storage keeping one row per document in a SQLite database.
+
+        Documents are stored as JSON alongside indexed columns (tag,
+        tag_version, most_recent, module, category) and normalized
+        input/output file tables indexed by path. TinyDB hands over the whole
+        database on every write, so `write` compares it with the last state
+        seen and only touches rows that changed. Reads are served from memory
+        until another connection commits to the file.
+
+        Documents returned by `read` are shallow copies; nested file lists are
+        shared with the cache and must not be modified in place.
+
+        Parameters
+        ----------
+        path : str
+            Path to the SQLite database file
+        """
+        self.path = path
+        # the tracker lock serializes access, so threads may share the connection
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.cache = None
+        self.data_version = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _data_version(self):
+        return(self.conn.execute('PRAGMA data_version').fetchone()[0])
+
+    def stamp(self):
+        """Changes whenever another connection commits to the database."""
+        return(self._data_version())
+
+    def read(self):
+        data_version = self._data_version()
+        if self.cache is None or data_version != self.data_version:
+            self.cache = {}
+            for tbl, doc_id, doc in self.conn.execute(
+                    'SELECT tbl, doc_id, doc FROM entries ORDER BY tbl, doc_id'):
+                self.cache.setdefault(tbl, {})[str(doc_id)] = json.loads(doc)
+                self.bytes_read += len(doc)
+            self.data_version = data_version
+        if not self.cache:
+            return(None)
+        return({tbl: {doc_id: dict(doc) for doc_id, doc in table.items()}
+                for tbl, table in self.cache.items()})
+
+    def write(self, data):
+        if self.cache is None:
+            self.read()
+        cache = {}
+        cur = self.conn.cursor()
+        cur.execute('BEGIN IMMEDIATE')
+        try:
+            for tbl in set(self.cache) - set(data):
+                self._delete(cur, tbl)
+            for tbl, table in data.items():
+                old = self.cache.get(tbl, {})
+                cache[tbl] = {}
+                for doc_id in set(old) - set(table):
+                    self._delete(cur, tbl, doc_id)
+                for doc_id, doc in table.items():
+                    if doc_id not in old or old[doc_id] != doc:
+                        self.bytes_written += self._upsert(cur, tbl, doc_id, doc)
+                        cache[tbl][doc_id] = copy.deepcopy(doc)
+                    else:
+                        cache[tbl][doc_id] = old[doc_id]
+            cur.execute('COMMIT')
+        except BaseException:
+            cur.execute('ROLLBACK')
+            self.cache = None
+            raise
+        self.cache = cache
+        self.data_version = self._data_version()
+
+    @staticmethod
+    def _delete(cur, tbl, doc_id=None):
+        for table in ('entries', 'input_files', 'output_files'):
+            if doc_id is None:
+                cur.execute(f'DELETE FROM {table} WHERE tbl = ?', (tbl,))
+            else:
+                cur.execute(f'DELETE FROM {table} WHERE tbl = ? AND doc_id = ?', (tbl, int(doc_id)))
+
+    @classmethod
+    def _upsert(cls, cur, tbl, doc_id, doc):
+        """Replace a document's rows, returning the size of its JSON."""
+        doc_id = int(doc_id)
+        text = json.dumps(doc)
+        most_recent = doc.get('most_recent')
+        cls._delete(cur, tbl, doc_id)
+        cur.execute(
+            'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (tbl, doc_id, doc.get('tag'), doc.get('version'), doc.get('tag_version'),
+             None if most_recent is None else int(most_recent),
+             doc.get('module'), doc.get('category'), doc.get('time'), text))
+        cur.executemany(
+            'INSERT INTO input_files VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(tbl, doc_id, i, f.get('tag'), f.get('path'), f.get('entry_tag'), f.get('version'))
+             for i, f in enumerate(doc.get('input_files') or [])])
+        cur.executemany(
+            'INSERT INTO output_files VALUES (?, ?, ?, ?, ?)',
+            [(tbl, doc_id, i, f.get('tag'), f.get('path'))
+             for i, f in enumerate(doc.get('output_files') or [])])
+        return(len(text))
+
+    def compact(self):
+        self.conn.execute('VACUUM')
+
+    def close(self):
+        self.conn.close()
+
+
+JOURNAL_EXTENSIONS = ('.jsonl',)
+
+
+class JournalStorage(Storage):
+    def __init__(self, path, compact_ratio=4, min_records=1000, **kwargs):
+        """TinyDB storage appending changes to a JSON-lines journal.
+
+        Each line records one change: a document put, a document delete or a
+        table drop. `write` compares the database handed over by TinyDB with
+        the last state seen and appends only the changed documents, so a save
+        costs the size of the entry rather than the size of the tracker.
+        `read` replays the journal into memory once and afterwards only reads
+        lines appended since. `compact` rewrites the journal as a snapshot of
+        the live documents; it runs automatically once the journal holds more
+        than `compact_ratio` records per live document.
+
+        Documents returned by `read` are shallow copies; nested file lists are
+        shared with the cache and must not be modified in place.
+
+        Parameters
+        ----------
+        path : str
+            Path to the journal file
+        compact_ratio : int, optional
+            Journal records allowed per live document, by default 4
+        min_records : int, optional
+            Never compact journals shorter than this, by default 1000
+        """
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.min_records = min_records
+        if not os.path.exists(path):
+            open(path, 'a').close()
+        self.cache = None
+        self.seen = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.offset = 0
+        self.records = 0
+
+    def stamp(self):
+        stat = os.stat(self.path)
+        return((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+
+    def _replay(self):
+        stamp = self.stamp()
+        if self.cache is not None and stamp == self.seen:
+            return
+        if self.cache is None or self.seen is None or stamp[0] != self.seen[0] or stamp[1] < self.offset:
+            self.cache, self.offset, self.records = {}, 0, 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    logger.warning(f"Ignoring incomplete journal record in {self.path}")
+                    break
+                self.offset += len(line)
+                self.bytes_read += len(line)
+                self.records += 1
+                self._apply(json.loads(line))
+        self.seen = stamp
+
+    def _apply(self, record):
+        op, tbl = record['op'], record['table']
+        if op == 'put':
+            self.cache.setdefault(tbl, {})[record['id']] = record['doc']
+        elif op == 'del':
+            self.cache.get(tbl, {}).pop(record['id'], None)
+        elif op == 'drop':
+            self.cache.pop(tbl, None)
+
+    def read(self):
+        self._replay()
+        if not self.cache:
+            return(None)
+        return({tbl: {doc_id: dict(doc) for doc_id, doc in table.items()}
+                for tbl, table in self.cache.items()})
+
+    def write(self, data):
+        self._replay()
+        records = [{'op': 'drop', 'table': tbl} for tbl in set(self.cache) - set(data)]
+        cache = {}
+        for tbl, table in data.items():
+            old = self.cache.get(tbl, {})
+            cache[tbl] = {}
+            records.extend({'op': 'del', 'table': tbl, 'id': doc_id}
+                           for doc_id in set(old) - set(table))
+            for doc_id, doc in table.items():
+                if doc_id not in old or old[doc_id] != doc:
+                    records.append({'op': 'put', 'table': tbl, 'id': doc_id, 'doc': doc})
+                    cache[tbl][doc_id] = copy.deepcopy(doc)
+                else:
+                    cache[tbl][doc_id] = old[doc_id]
+        if records:
+            self._append(records)
+        self.cache = cache
+        if self.records > max(self.min_records, self.compact_ratio * self._live()):
+            self.compact()
+
+    def _append(self, records):
+        lines = ''.join(json.dumps(r) + '\n' for r in records).encode()
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.offset)
+            f.seek(self.offset)
+            f.write(lines)
+        self.offset += len(lines)
+        self.bytes_written += len(lines)
+        self.records += len(records)
+        self.seen = self.stamp()
+
+    def _live(self):
+        return(sum(len(table) for table in self.cache.values()))
+
+    def compact(self):
+        """Rewrite the journal as one put record per live document."""
+        self._replay()
+        records = [{'op': 'put', 'table': tbl, 'id': doc_id, 'doc': doc}
+                   for tbl, table in self.cache.items() for doc_id, doc in table.items()]
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.writelines(json.dumps(r) + '\n' for r in records)
+        os.replace(tmp, self.path)
+        logger.info(f"Compacted {self.records} journal records into {len(records)} in {self.path}")
+        self.offset = os.path.getsize(self.path)
+        self.bytes_written += self.offset
+        self.records = len(records)
+        self.seen = self.stamp()
+
+
+STORAGES = {
+    'json': AtomicJSONStorage,
+    'sqlite': SQLiteStorage,
+    'journal': JournalStorage
+}
+
+
+def _is_json_file(path):
+    """Whether path is an existing, non-empty file without the SQLite header."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(len(SQLITE_HEADER))
+    except OSError:
+        return(False)
+    return(bool(header) and header != SQLITE_HEADER)
+
+
+def get_storage(path, storage=None):
+    """Resolve the TinyDB storage class for a tracker path.
+
+    Parameters
+    ----------
+    path : str
+        Path to the tracker database
+    storage : str or class, optional
+        Storage name ('json', 'sqlite', 'journal') or TinyDB storage class, by
+        default inferred from the path extension. Existing JSON databases keep
+        the JSON backend even when their extension is a SQLite one, like .db
+
+    Examples
+    --------
+    >>> get_storage('tracker.sqlite')
+    """
+    if storage is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension in SQLITE_EXTENSIONS and not _is_json_file(path):
+            storage = 'sqlite'
+        elif extension in JOURNAL_EXTENSIONS:
+            storage = 'journal'
+        else:
+            storage = 'json'
+    if isinstance(storage, str):
+        storage = STORAGES[storage]
+    return(storage)
@@ -2,73 +2,454 @@
 
 import os
 import sys
-import pandas as pd
+import copy
 import subprocess
 from shutil import copyfile
 from collections import Counter
+from contextlib import contextmanager
 from logzero import logger
 from tinydb import TinyDB, Query
-from .dictlist import DictList
+from .checksum import checksum_files
+from .entry import check_files, fingerprint
+from .index import TrackerIndex
+from .lock import FileLock
+from .metrics import Metrics, timed
+from .pathcache import PathCache, PATH_TTL
+from .query import QueryPlan
+from .storage import BatchMiddleware, get_storage
 from .utils import sort_versions
 
+CATEGORICAL_COLUMNS = ['tag', 'category', 'module', 'version']
+RESOURCE_COLUMNS = ['wall_time', 'cpu_time', 'peak_rss', 'read_bytes', 'write_bytes']
+
 
 class Tracker(object):
-    def __init__(self, path=None):
-        """Constructor for class Tracker"""
+    def __init__(self, path=None, storage=None, path_ttl=PATH_TTL, checksums=None, metrics=None):
+        """Constructor for class Tracker
+
+        Parameters
+        ----------
+        path : str, optional
+            Path to the database, by default the TRACKER_PATH environment variable
+        storage : str or class, optional
+            Storage backend, 'json', 'sqlite' or 'journal', by default inferred
+            from the path extension (new .sqlite, .sqlite3 and .db files use
+            SQLite, .jsonl an append-only journal)
+        path_ttl : float, optional
+            Seconds a cached cloud path existence check stays fresh, by
+            default 3600
+        checksums : bool, optional
+            Record a checksum of every input and output file on save, by
+            default only if the CHECKSUMS environment variable is set
+        metrics : bool, optional
+            Record call counts and latencies of tracker operations, see
+            `stats`, by default only if the TRACKER_METRICS environment
+            variable is set
+        """
         self.path = path if path is not None else os.environ['TRACKER_PATH']
-        self.db = TinyDB(self.path)
+        self.storage = get_storage(self.path, storage)
+        self.db = TinyDB(self.path, storage=BatchMiddleware(self.storage))
         self.entry = Query()
+        self.lock = FileLock(f"{self.path}.lock")
+        self.path_ttl = path_ttl
+        self.checksums = 'CHECKSUMS' in os.environ if checksums is None else checksums
+        self.metrics = Metrics('TRACKER_METRICS' in os.environ if metrics is None else metrics)
+        self._io_baseline = (0, 0)
+        self._paths = None
+        self._index = None
+        self._batch = None
+        self._batch_removed = None
+        self._stamp = None
+
+    @property
+    def paths(self):
+        """Cache of cloud path existence checks, kept next to the database."""
+        if self._paths is None:
+            self._paths = PathCache(f"{self.path}.paths.sqlite", ttl=self.path_ttl)
+        return(self._paths)
+
+    @property
+    def index(self):
+        """In-memory index over the database.
+
+        Built on first use and kept until another process changes the
+        database, so repeated lookups do not touch the file. Waits while
+        another thread of this process is writing.
+        """
+        with self.lock.thread_lock:
+            if not self.lock.locked:
+                self._refresh()
+            if self._index is None:
+                self._stamp = self._current_stamp()
+                self._index = TrackerIndex(self.db.all())
+            return(self._index)
+
+    def _current_stamp(self):
+        storage = self.db.storage.storage
+        if hasattr(storage, 'stamp'):
+            return(storage.stamp())
+        stat = os.stat(self.path)
+        return((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+
+    def _refresh(self):
+        """Drop in-memory state if another process changed the database."""
+        if self._stamp == self._current_stamp():
+            return
+        self._index = None
+        self.db.clear_cache()
+        # TinyDB caches the next document id, which another writer may have taken
+        self.db.table(self.db.default_table_name)._next_id = None
+
+    @contextmanager
+    def _writing(self):
+        """Hold the tracker lock around a read-modify-write of the database."""
+        with self.lock:
+            self._refresh()
+            yield
+            self._stamp = self._current_stamp()
+
+    @contextmanager
+    def _transaction(self):
+        """Write the database once when the block exits, or not at all if it raises."""
+        if self.db.storage.active:
+            yield
+            return
+        self.db.storage.begin()
+        try:
+            yield
+        except BaseException:
+            self.db.storage.discard()
+            self.db.clear_cache()
+            self.db.table(self.db.default_table_name)._next_id = None
+            self._index = None
+            raise
+        else:
+            self.db.storage.commit()
 
+    @timed('save')
     def save(self, entry):
-        self.db.insert(entry.properties)
-        self.deduplicate()
-        self.label_recent()
+        """Save an entry, replacing any older record with the same tag_version.
+
+        Input files created with `defer=True` are checked for existence first,
+        through the path cache. Cached records for the entry's output files are
+        dropped, since saving the entry means they were just written. If the
+        tracker records checksums, files without one are checksummed.
+
+        Parameters
+        ----------
+        entry : Entry
+            Entry to insert into the database
 
+        See Also
+        --------
+        deduplicate, label_recent
+        """
+        check_files([entry], cache=self.paths)
+        self.paths.invalidate([f['path'] for f in entry['output_files']])
+        if self.checksums:
+            checksum_files([entry], cache=self.paths)
+        with self._writing():
+            index = self.index
+            duplicates = index.duplicates(entry['tag_version'])
+            times = [index.docs[doc_id]['time'] for doc_id in duplicates]
+            if self._batch is not None and entry['tag_version'] in self._batch:
+                times.append(self._batch[entry['tag_version']]['time'])
+            if any(time > entry['time'] for time in times):
+                logger.info(f"A newer entry is already saved for {entry['tag_version']}")
+                return
+            if self._batch is not None:
+                # TinyDB rewrites the whole table on every insert or remove, so
+                # a batch applies them all at once when it exits
+                for doc_id in duplicates:
+                    index.discard(doc_id)
+                self._batch_removed.extend(duplicates)
+                self._batch[entry['tag_version']] = dict(entry.properties)
+                return
+            with self._transaction():
+                if duplicates:
+                    self._remove(doc_ids=list(duplicates))
+                doc_id = self.db.insert(entry.properties)
+                index.add(doc_id, entry.properties)
+                self._label_tags([entry['tag']])
+
+    @timed('save_many')
+    def save_many(self, entries):
+        """Save several entries, writing the database once.
+
+        Parameters
+        ----------
+        entries : list
+            Entries to insert into the database
+
+        See Also
+        --------
+        save, batch
+        """
+        check_files(entries, cache=self.paths)
+        if self.checksums:
+            checksum_files(entries, cache=self.paths)
+        with self.batch():
+            for entry in entries:
+                self.save(entry)
+
+    @contextmanager
+    def batch(self):
+        """Buffer saves in memory and write the database once on exit.
+
+        Entries saved inside the block are inserted together when it exits,
+        and only then show up in lookups; the tags they touch are relabelled
+        once. If the block raises, nothing is written. The tracker lock is held
+        for the whole block, so other writers wait until it exits.
+
+        Examples
+        --------
+        >>>with tr.batch():
+        ...    for entry in entries:
+        ...        tr.save(entry)
+        """
+        with self._writing():
+            if self._batch is not None:
+                yield self
+                return
+            self._batch, self._batch_removed = {}, []
+            try:
+                with self._transaction():
+                    yield self
+                    if self._batch_removed:
+                        self.db.remove(doc_ids=self._batch_removed)
+                    docs, index = list(self._batch.values()), self.index
+                    for doc_id, doc in zip(self.db.insert_multiple(docs), docs):
+                        index.add(doc_id, doc)
+                    self._label_tags({doc['tag'] for doc in docs})
+            finally:
+                self._batch, self._batch_removed = None, None
+
+    @timed('filter')
     def filter(self, cond):
-        """tr.filter(tr.entry.tag == "tag")"""
-        return(self.db.search(cond))
+        """Search entries with a TinyDB query.
+
+        Equality and `one_of` tests on tag, version, tag_version, module,
+        category, most_recent and time, and range tests on time, are answered
+        from the index; the rest of the query is only evaluated on the
+        documents they select.
+
+        See Also
+        --------
+        explain
+
+        Examples
+        --------
+        >>>tr.filter(tr.entry.tag == "tag")
+        >>>tr.filter((tr.entry.module == "qc") & (tr.entry.time > 1600000000))
+        """
+        plan = QueryPlan(cond, self.index)
+        docs = plan.run()
+        self.metrics.count('filter', 'documents_scanned', plan.scanned)
+        return([plan.index.document(doc_id) for doc_id, doc in docs])
+
+    def explain(self, cond):
+        """Describe which indexes `filter` uses for a query.
+
+        Examples
+        --------
+        >>>print(tr.explain((tr.entry.tag == "tag") & (tr.entry.description == "x")))
+        """
+        return(QueryPlan(cond, self.index).explain())
+
+    def find_cached(self, entry):
+        """Newest saved entry with the same fingerprint whose output files all exist.
+
+        Computes the entry's fingerprint, which `save` then records, so only
+        entries that were checked this way can be found later.
+
+        The fingerprint covers the entry's tag, version and input files, see
+        `datatracker.entry.fingerprint`. If the tracker records checksums,
+        input files are checksummed first, so content changes are detected
+        even when a file's mtime is not. Inputs and outputs are checked in
+        storage rather than trusted from the path cache, whose records may be
+        up to `path_ttl` seconds old.
+
+        Returns
+        -------
+        Document or None
+        """
+        if self.checksums:
+            checksum_files([entry], cache=self.paths)
+        if entry.properties.get('fingerprint') is None:
+            entry['fingerprint'] = fingerprint(entry, cache=self.paths)
+        index = self.index
+        doc_ids = sorted(index.values('fingerprint').get(entry['fingerprint'], ()),
+                         key=lambda doc_id: index.docs[doc_id]['time'], reverse=True)
+        for doc_id in doc_ids:
+            outputs = [f['path'] for f in index.docs[doc_id]['output_files']]
+            if all(self.paths.exists_many(outputs, fresh=True).values()):
+                return(index.document(doc_id))
+        return(None)
+
+    def is_up_to_date(self, entry):
+        """Whether a saved entry already ran on the same inputs and its outputs still exist.
+
+        See Also
+        --------
+        find_cached, datatracker.entry.Entry.cached
+
+        Examples
+        --------
+        >>>if not tr.is_up_to_date(entry):
+        ...    run_step()
+        """
+        return(self.find_cached(entry) is not None)
+
+    def graph(self):
+        """Lineage graph linking the most recent entries through their files.
+
+        Superseded versions are left out, so upstream, downstream and
+        topological_order only report dependencies a current entry has. Built
+        from the index on first use and updated as entries are saved, removed
+        and relabelled.
+
+        See Also
+        --------
+        datatracker.graph.LineageGraph
+
+        Examples
+        --------
+        >>>tr.graph().downstream("entry_tag")
+        """
+        return(self.index.lineage)
+
+    def stale(self):
+        """Most recent entries that need to be re-run, in dependency order.
+
+        An entry is stale when an input names an upstream entry_tag whose most
+        recent version differs from the version it recorded, or when an input
+        path was written again by a most recent upstream entry after the entry
+        was saved. Everything downstream of a stale entry is stale as well,
+        following the lineage of most recent entries only, so dependencies
+        of superseded versions, including cycles through them, are ignored.
+        Only entries with upstream links in the lineage graph are checked, and
+        after the first call only those whose entries or upstream entries were
+        saved, removed or relabelled since.
+
+        Returns
+        -------
+        list
+            Documents ordered so each comes after the entries it depends on
+
+        See Also
+        --------
+        graph
+
+        Examples
+        --------
+        >>>[entry['tag'] for entry in tr.stale()]
+        """
+        index = self.index
+        graph = index.lineage
+        stale = index.outdated()
+        stale |= graph.downstream(stale)
+        doc_ids = [index.entry_id(tag) for tag in graph.topological_order(stale)]
+        return([index.document(doc_id) for doc_id in doc_ids if doc_id is not None])
 
     def uniq(self, property):
         return(set(self[property]))
 
-    def label_recent(self):
-        tags = self.uniq('tag')
+    @timed('label_recent')
+    def label_recent(self, tag=None):
+        """Flag the entries holding the most recent version of their tag.
+
+        Only documents whose flag changes are written back.
+
+        Parameters
+        ----------
+        tag : str, optional
+            Relabel this tag only, by default every tag in the database
+        """
+        with self._writing(), self._transaction():
+            updated = self._label_tags(list(self.index.tags) if tag is None else [tag])
+            self.metrics.count('label_recent', 'documents_updated', updated)
+
+    def _label_tags(self, tags):
+        recent, outdated = [], []
+        index = self.index
         for t in tags:
-            entries = self.filter(self.entry.tag == t)
-            versions = [e['version'] for e in entries]
-            most_recent = sort_versions(versions)[-1]
-            self.db.update({'most_recent': True}, ((
-                self.entry.tag == t) & (self.entry.version == most_recent)))
-            self.db.update({'most_recent': False}, ((
-                self.entry.tag == t) & (self.entry.version != most_recent)))
+            versions = index.versions(t)
+            if not versions:
+                continue
+            most_recent = sort_versions(set(versions.values()))[-1]
+            for doc_id, version in versions.items():
+                flag = version == most_recent
+                if index.docs[doc_id].get('most_recent') != flag:
+                    (recent if flag else outdated).append(doc_id)
+        self._update_docs({'most_recent': True}, recent)
+        self._update_docs({'most_recent': False}, outdated)
+        return(len(recent) + len(outdated))
+
+    def _update_docs(self, fields, doc_ids):
+        if not doc_ids:
+            return
+        self.db.update(fields, doc_ids=doc_ids)
+        index = self.index
+        for doc_id in doc_ids:
+            index.update(doc_id, fields)
 
     def remove(self, cond):
         """tr.remove(tr.entry.tag == "tag")"""
         logger.info(f"Conditional for removing entries: {cond}")
-        self.db.remove(cond)
+        with self._writing():
+            self._remove(cond)
+
+    def _remove(self, cond=None, doc_ids=None):
+        removed = self.db.remove(cond, doc_ids=doc_ids)
+        index = self.index
+        for doc_id in removed:
+            index.discard(doc_id)
+        return(removed)
 
+    @timed('deduplicate')
     def deduplicate(self):
-        vtags = [key for key, value in Counter(
-            self['tag_version']).items() if value >= 2]
-        for tv in vtags:
-            entries = self.filter(self.entry.tag_version == tv)
-            times = [e['time'] for e in entries]
-            most_recent = sorted(times)[-1]
-            self.db.remove(((self.entry.tag_version == tv) &
-                            (self.entry.time != most_recent)))
+        """Repair the database by keeping only the latest record per tag_version.
+
+        `save` already replaces older records, so this is only needed for
+        databases written by older versions or edited by hand.
+        """
+        with self._writing(), self._transaction():
+            self.metrics.count('deduplicate', 'documents_scanned', len(self.index))
+            vtags = [key for key, value in Counter(
+                self['tag_version']).items() if value >= 2]
+            for tv in vtags:
+                entries = self.filter(self.entry.tag_version == tv)
+                times = [e['time'] for e in entries]
+                most_recent = sorted(times)[-1]
+                self._remove(((self.entry.tag_version == tv) &
+                              (self.entry.time != most_recent)))
+
+    def compact(self):
+        """Compact the storage backend, if it supports it.
+
+        Rewrites a journal as a snapshot of its live entries and vacuums a
+        SQLite database. JSON files are always compact.
+        """
+        storage = self.db.storage.storage
+        if hasattr(storage, 'compact'):
+            with self._writing():
+                storage.compact()
 
     def copy(self, path):
         copyfile(self.path, path)
-        return(Tracker(path))
+        return(Tracker(path, storage=self.storage))
 
+    @timed('get_entry')
     def get_entry(self, entry_tag, version=None):
-        if version is not None:
-            entry = self.filter((self.entry.tag == entry_tag) & (
-                self.entry.version == version))[0]
-        else:
-            entry = self.filter((self.entry.tag == entry_tag) & (
-                self.entry.most_recent == True))[0]
-        return(entry)
+        doc_id = self._entry_id(entry_tag, version)
+        return(self.index.document(doc_id))
+
+    def _entry_id(self, entry_tag, version=None):
+        doc_id = self.index.entry_id(entry_tag, version)
+        if doc_id is None:
+            which = 'most recent version' if version is None else f'version {version}'
+            raise IndexError(f"No entry with tag {entry_tag} at {which}")
+        return(doc_id)
 
     def get_file(self, entry_tag, file_tag, version=None):
         """Get File dictionary given entry tag and file tag
@@ -90,9 +471,54 @@ class Tracker(object):
         --------
         >>>tr.get_file("entry_tag", "file_tag")
         """
-        entry = self.get_entry(entry_tag, version)['output_files']
-        dli = DictList(entry)
-        return(dli.filter_first(cond=lambda x: x['tag'] == file_tag))
+        file = self.index.output_file(self._entry_id(entry_tag, version), file_tag)
+        return(None if file is None else dict(file))
+
+    def find_path(self, path, prefix=False, most_recent=False):
+        """Find the entries that wrote an output file path.
+
+        Answered from a sorted path index kept up to date by `save` and
+        `remove`, without scanning the entries.
+
+        Parameters
+        ----------
+        path : str
+            Output file path, or the start of paths if prefix is True
+        prefix : bool, optional
+            Match every path starting with path, e.g. a bucket directory, by
+            default False
+        most_recent : bool, optional
+            Keep only most recent entries, by default False
+
+        Returns
+        -------
+        list
+            Dictionaries with path, tag, version, file_tag and most_recent,
+            sorted by path and newest entry first
+
+        See Also
+        --------
+        get_file, explode
+
+        Examples
+        --------
+        >>>tr.find_path("gs://bucket/dir/", prefix=True)
+        """
+        index = self.index
+        paths = index.paths.under(path) if prefix else [path]
+        found = []
+        for p in paths:
+            writers = []
+            for doc_id, file_tag in index.paths.get(p):
+                doc = index.docs[doc_id]
+                if most_recent and not doc.get('most_recent'):
+                    continue
+                writers.append((doc.get('time', 0), {
+                    'path': p, 'tag': doc['tag'], 'version': doc['version'],
+                    'file_tag': file_tag, 'most_recent': doc.get('most_recent')}))
+            writers.sort(key=lambda item: item[0], reverse=True)
+            found.extend(writer for _, writer in writers)
+        return(found)
 
     def get_file_path(self, *args, **kwargs):
         return(self.get_file(*args, **kwargs)['path'])
@@ -120,70 +546,161 @@ class Tracker(object):
     def update(self):
         pass
 
-    def to_pandas(self, tag=None, module=None, most_recent=True):
-        df = pd.DataFrame.from_dict([row for row in self.db])
-        if df.empty:
-            return(df)
-        df = df.sort_values('time', ascending=False)
-        if tag:
-            df = df[df.tag == tag]
-        if module:
-            df = df[df.module == module]
-        if most_recent:
-            df = df[df.most_recent]
+    @timed('to_pandas')
+    def to_pandas(self, tag=None, module=None, most_recent=True, columns=None):
+        """Export entries to a DataFrame, newest first.
+
+        Filters are applied to the index before the DataFrame is built, which
+        is constructed column by column, so filtering to one tag only
+        materializes that tag's rows. Repeated strings are stored as
+        categoricals. Rows are labelled by document id.
+
+        Parameters
+        ----------
+        tag : str, optional
+            Keep entries with this tag, by default all tags
+        module : str, optional
+            Keep entries from this module, by default all modules
+        most_recent : bool, optional
+            Keep only the most recent version of each tag, by default True
+        columns : list, optional
+            Columns to export, by default every property of the entries
+
+        Examples
+        --------
+        >>>tr.to_pandas(tag="entry_tag", columns=['tag', 'version', 'time'])
+        """
+        import pandas as pd
+        index = self.index
+        if not index:
+            return(pd.DataFrame())
+        docs = self._select(tag, module, most_recent)
+        self.metrics.count('to_pandas', 'documents', len(docs))
+        if columns is None:
+            sample = docs if docs else [next(iter(index.docs.items()))]
+            columns = list(dict.fromkeys(key for _, doc in sample for key in doc))
+        df = pd.DataFrame({col: [doc.get(col) for _, doc in docs] for col in columns},
+                          index=[doc_id for doc_id, _ in docs], columns=columns)
+        for col in CATEGORICAL_COLUMNS:
+            if col in df:
+                df[col] = df[col].astype('category')
         return(df)
 
-    def explode(self, *args, **kwargs):
-        df = self.to_pandas(*args, **kwargs)
+    def _select(self, tag=None, module=None, most_recent=True):
+        """Indexed (doc_id, document) pairs matching the filters, newest first."""
+        index = self.index
+        ids = sorted(index.tags.get(tag, ())) if tag else index.docs
+        docs = [(doc_id, index.docs[doc_id]) for doc_id in ids]
+        if module:
+            docs = [(doc_id, doc) for doc_id, doc in docs if doc['module'] == module]
+        if most_recent:
+            docs = [(doc_id, doc) for doc_id, doc in docs if doc.get('most_recent')]
+        docs.sort(key=lambda item: item[1].get('time', 0), reverse=True)
+        return(docs)
 
-        df = df[['tag', 'category', 'module', 'description',
-                 'version', 'input_files', 'output_files', 'most_recent', 'time']]
+    @timed('explode')
+    def explode(self, tag=None, module=None, most_recent=True):
+        """Export one row per input and output file of each entry.
 
-        df0 = df.drop('output_files', axis=1).rename(
-            {'input_files': 'files'}, axis=1)
-        df1 = df.drop('input_files', axis=1).rename(
-            {'output_files': 'files'}, axis=1)
+        Files are flattened in a single pass over the indexed entries straight
+        into column lists, which are handed to pandas once.
 
-        df0 = self._explode_files(df0)
-        df1 = self._explode_files(df1)
+        Parameters
+        ----------
+        tag : str, optional
+            Keep entries with this tag, by default all tags
+        module : str, optional
+            Keep entries from this module, by default all modules
+        most_recent : bool, optional
+            Keep only the most recent version of each tag, by default True
 
-        df = pd.concat([df0.assign(type='input'),
-                        df1.assign(type='output')], axis=0)
-        df['basename'] = df['path'].apply(os.path.basename)
+        See Also
+        --------
+        to_pandas
+        """
+        import pandas as pd
+        entry_columns = ['tag', 'category', 'module', 'description', 'most_recent', 'time']
+        columns = {col: [] for col in entry_columns + ['file_tag', 'type', 'file_desc', 'path', 'index']}
+        doc_ids = []
+        selected = self._select(tag, module, most_recent)
+        self.metrics.count('explode', 'documents', len(selected))
+        for doc_id, doc in selected:
+            for type, key in (('input', 'input_files'), ('output', 'output_files')):
+                files = doc.get(key) or []
+                if not files:
+                    continue
+                n = len(files)
+                doc_ids.extend([doc_id] * n)
+                for col in entry_columns:
+                    columns[col].extend([doc.get(col)] * n)
+                columns['type'].extend([type] * n)
+                columns['index'].extend(range(n))
+                columns['file_tag'].extend([file.get('tag') for file in files])
+                columns['file_desc'].extend([file.get('description') for file in files])
+                columns['path'].extend([file.get('path') for file in files])
+        columns['basename'] = [path.rpartition('/')[2] if path else path
+                               for path in columns['path']]
+        df = pd.DataFrame(columns, index=doc_ids)
+        for col in CATEGORICAL_COLUMNS + ['type']:
+            if col in df:
+                df[col] = df[col].astype('category')
         df = df[['tag', 'category', 'module', 'file_tag', 'description', 'type',
                  'file_desc', 'basename', 'path', 'most_recent', 'index', 'time']]
         df = df.sort_values(['time', 'category', 'module', 'tag', 'type', 'index'], ascending=[
                             False, True, True, True, True, True])
         return(df)
 
-    def _explode_files(self, df):
-        df['files'] = df['files'].map(
-            lambda l: [dict(x, **{'index': i}) for i, x in enumerate(l)])
-        df = df.explode('files')
-        df = df[df.files.notnull()]
-        df['file_tag'] = df['files'].map(lambda x: x['tag'])
-        df['path'] = df['files'].map(lambda x: x['path'])
-        df['file_desc'] = df['files'].map(lambda x: x['description'])
-        df['index'] = df['files'].map(lambda x: x['index'])
-        df = df.drop('files', axis=1)
-        return(df)
+    def stats(self):
+        """Metrics of tracker operations since the tracker was opened or reset.
+
+        Recorded only when the tracker was created with `metrics=True` or the
+        TRACKER_METRICS environment variable set. For each operation: calls,
+        total, mean and max seconds, a latency histogram and counters such as
+        documents scanned. Bytes read and written by the storage are counted
+        regardless.
+
+        See Also
+        --------
+        reset_stats
+
+        Examples
+        --------
+        >>>tr = Tracker(metrics=True)
+        >>>tr.stats()['save']['mean_time']
+        """
+        stats = self.metrics.stats()
+        storage = self.db.storage.storage
+        if hasattr(storage, 'bytes_read'):
+            stats['storage'] = {'bytes_read': storage.bytes_read - self._io_baseline[0],
+                                'bytes_written': storage.bytes_written - self._io_baseline[1]}
+        return(stats)
+
+    def reset_stats(self):
+        """Clear the metrics returned by `stats`."""
+        self.metrics.reset()
+        storage = self.db.storage.storage
+        if hasattr(storage, 'bytes_read'):
+            self._io_baseline = (storage.bytes_read, storage.bytes_written)
 
     def to_excel(self, path, **kwargs):
         df = self.to_pandas(**kwargs)
         df.to_excel(path)
 
     def kill(self):
-        self.db.truncate()
+        with self._writing():
+            self.db.truncate()
+            self._index = None
 
     def __len__(self):
-        return(len(self.db))
+        return(len(self.index))
 
     def __getitem__(self, property):
-        return([row[property] for row in self.db])
+        return([copy.deepcopy(doc[property]) for doc in self.index.docs.values()])
 
     @property
     def entries(self):
-        return(self.db.all())
+        index = self.index
+        return([index.document(doc_id) for doc_id in index.docs])
 
     @property
     def table(self):
@@ -191,6 +708,6 @@ class Tracker(object):
 
     @property
     def summary(self):
-        df = self.table[['category', 'module', 'tag', 'description',
-                         'version', 'date', 'time', 'most_recent']]
-        return(df.sort_values('time', ascending=False))
+        return(self.to_pandas(tag=None, most_recent=False, columns=[
+            'category', 'module', 'tag', 'description', 'version', 'date', 'time', 'most_recent']
+            + RESOURCE_COLUMNS))
@@ -4,9 +4,10 @@ import os
 import sys
 from logzero import logger
 import re
+import asyncio
 import subprocess
-import pandas as pd
-from pkg_resources import parse_version
+from .fs import PARALLELISM, get_fs, run as fs_run
+from .versions import version_key
 
 
 def gsutil(*args, silent=True, debug=False):
@@ -29,25 +30,31 @@ def gsutil(*args, silent=True, debug=False):
 
 def gs_ls(path, pattern=None, trimdir=True):
     """gs_ls(tr.get_file_path('rare-gtfilt-genotypes-mt', 'rare-filtered-genotypes-mt'), pattern='.mt$')"""
-    output = gsutil(*['ls', path])
-    if re.search("\n", output):
-        output = output.split("\n")
-        if trimdir:
-            output = [re.sub('\\/$', '', o) for o in output]
-        if pattern:
-            output = [o for o in output if re.search(pattern, o)]
-        if len(output) == 1:
-            output = output[0]
+    output = fs_run(get_fs().ls(path))
+    if trimdir:
+        output = [re.sub('\\/$', '', o) for o in output]
+    if pattern:
+        output = [o for o in output if re.search(pattern, o)]
+    if len(output) == 0:
+        output = ''
+    elif len(output) == 1:
+        output = output[0]
     return(output)
 
 
+def _fs_call(coro, desc, silent=True):
+    try:
+        fs_run(coro)
+    except Exception as e:
+        logger.error(f"{desc}\n{e}")
+        return(str(e))
+    if not silent:
+        logger.info(desc)
+    return('')
+
+
 def gs_rm(path, recursive=True, silent=True):
-    args = ['-m', 'rm']
-    if recursive:
-        args.append('-r')
-    args.append(path)
-    output = gsutil(*args, silent=silent)
-    return(output)
+    return(_fs_call(get_fs().rm(path, recursive=recursive), f"rm {path}", silent=silent))
 
 
 def gs_mirror(path, dest_bucket, recursive=True, silent=True, debug=False):
@@ -62,21 +69,18 @@ def gs_mirror(path, dest_bucket, recursive=True, silent=True, debug=False):
     recursive : bool, optional
         Recursively copy files from the source directory, by default True
     silent : bool, optional
-        Print errors or log file from gsutil, by default True
+        Log the copy, errors are always logged, by default True
     debug : bool, optional
-        Print arguments from the gsutil command, by default False
+        Print the source and destination paths, by default False
 
     Examples
     --------
     >>> gs_mirror('gs://super-psychosis/data/resources/1.0_hl_log-resources',  'gs://superpheno/', silent=False, debug=True)
     """
-    args = ['-m', 'cp']
-    if recursive:
-        args.append('-r')
-    args.append(path)
-    args.append(os.path.join(dest_bucket, re.search('gs\:\/\/.*?\/(.*)', path).group(1)))
-    output = gsutil(*args, silent=silent, debug=debug)
-    return(output)
+    dest = os.path.join(dest_bucket, re.search(r'gs://.*?/(.*)', path).group(1))
+    if debug:
+        print((path, dest))
+    return(_fs_call(get_fs().copy(path, dest, recursive=recursive), f"cp {path} {dest}", silent=silent))
 
 
 def gs_view(cloudir):
@@ -85,14 +89,36 @@ def gs_view(cloudir):
 
 
 def sync_down(cloudir, localdir, ext='log', flag=''):
-    subprocess.call(['mkdir', '-p', localdir])
-    cmd = ['gsutil', '-m', 'cp',
-           f'-r{flag}',
-           f'{cloudir}/*.{ext}',
-           localdir]
-    p = subprocess.run(cmd, capture_output=True)
-    output, error = p.stdout.decode().strip(), p.stderr.decode().strip()
-    return(error)
+    """Copy files with an extension from a cloud directory to a local one.
+
+    Parameters
+    ----------
+    cloudir : str
+        Cloud directory to copy from, not recursed into
+    localdir : str
+        Local directory, created if missing
+    ext : str, optional
+        File extension to copy, by default 'log'
+    flag : str, optional
+        gsutil cp style flags; 'n' skips files that already exist locally
+
+    Returns
+    -------
+    str
+        Errors, empty if every copy succeeded
+    """
+    os.makedirs(localdir, exist_ok=True)
+    fs = get_fs()
+    pairs = [(p, os.path.join(localdir, os.path.basename(p)))
+             for p in fs_run(fs.ls(cloudir)) if p.endswith(f'.{ext}')]
+    if 'n' in flag:
+        pairs = [(src, dest) for src, dest in pairs if not os.path.exists(dest)]
+
+    async def copy_all():
+        return(await asyncio.gather(*[fs.copy(src, dest) for src, dest in pairs],
+                                    return_exceptions=True))
+    errors = [str(e) for e in fs_run(copy_all()) if isinstance(e, Exception)]
+    return('\n'.join(errors))
 
 
 def copy_resources_local(infile, outfile, run=True):
@@ -125,20 +151,52 @@ def is_cloud_path(path):
 
 
 def cloud_path_exists(path):
-    return(subprocess.run(['gsutil', 'ls', path], capture_output=True).stderr.decode() is '')
+    return(fs_run(get_fs().exists(path)))
 
 
 def local_path_exists(path):
     return(os.path.exists(os.path.realpath(os.path.expanduser(path))))
 
 
-def path_exists(path):
+def path_exists(path, cache=None):
     if is_cloud_path(path):
+        if cache is not None:
+            return(cache.exists(path))
         return(cloud_path_exists(path))
     else:
         return(local_path_exists(path))
 
 
+def paths_exist(paths, parallelism=PARALLELISM):
+    """Check whether many paths exist, with bounded concurrency for cloud paths.
+
+    Local paths are checked directly, cloud paths concurrently through the
+    filesystem returned by `get_fs`.
+
+    Parameters
+    ----------
+    paths : list
+        Local or cloud paths
+    parallelism : int, optional
+        Maximum number of cloud checks in flight, by default 150
+
+    Returns
+    -------
+    dict
+        Path to existence
+
+    Examples
+    --------
+    >>> paths_exist(['gs://bucket/a.bed', 'gs://bucket/b.bed'], parallelism=20)
+    """
+    paths = list(dict.fromkeys(paths))
+    cloud = [p for p in paths if is_cloud_path(p)]
+    exists = {p: local_path_exists(p) for p in paths if not is_cloud_path(p)}
+    if cloud:
+        exists.update(fs_run(get_fs().exists_many(cloud, parallelism=parallelism)))
+    return(exists)
+
+
 def filter_list(arr, pattern):
     arr = [a for a in arr if re.search(pattern, a)]
     if len(arr) == 1:
@@ -155,7 +213,7 @@ def excel_cache(df, name='summary'):
 
 
 def sort_versions(arr):
-    """Sort version tags using pkg_resource definition.
+    """Sort version tags in pkg_resources.parse_version order.
 
     Parameters
     ----------
@@ -166,8 +224,12 @@ def sort_versions(arr):
     >>> versions = ['0.1', '0.10', '0.2.1', '0.2', '0.10.1',
             '0.1.1+0.g3c5592b.dirty', '0.1.5', '0.2', '0.2']
     >>> sort_versions(versions)
+
+    See Also
+    --------
+    datatracker.versions.version_key
     """
-    return(sorted(arr, key=parse_version))
+    return(sorted(arr, key=version_key))
 
 
 def submit_dataproc(cluster_name : str, script_path : str, pyfiles_list : list, silent : bool = False, **kwargs):
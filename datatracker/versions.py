@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import re
+import math
+import functools
+from logzero import logger
+
+# PEP 440 version pattern, as used by packaging.version
+VERSION_PATTERN = r"""
+    v?
+    (?:
+        (?:(?P<epoch>[0-9]+)!)?
+        (?P<release>[0-9]+(?:\.[0-9]+)*)
+        (?P<pre>
+            [-_\.]?
+            (?P<pre_l>(a|b|c|rc|alpha|beta|pre|preview))
+            [-_\.]?
+            (?P<pre_n>[0-9]+)?
+        )?
+        (?P<post>
+            (?:-(?P<post_n1>[0-9]+))
+            |
+            (?:
+                [-_\.]?
+                (?P<post_l>post|rev|r)
+                [-_\.]?
+                (?P<post_n2>[0-9]+)?
+            )
+        )?
+        (?P<dev>
+            [-_\.]?
+            (?P<dev_l>dev)
+            [-_\.]?
+            (?P<dev_n>[0-9]+)?
+        )?
+    )
+    (?:\+(?P<local>[a-z0-9]+(?:[-_\.][a-z0-9]+)*))?
+"""
+
+_version_re = re.compile(r'^\s*' + VERSION_PATTERN + r'\s*$', re.VERBOSE | re.IGNORECASE)
+_local_separators = re.compile(r'[\._-]')
+_legacy_component_re = re.compile(r'(\d+ | [a-z]+ | \.| -)', re.VERBOSE)
+_legacy_replacements = {'pre': 'c', 'preview': 'c', '-': 'final-', 'rc': 'c', 'dev': '@'}
+_letters = {'alpha': 'a', 'beta': 'b', 'c': 'rc', 'pre': 'rc', 'preview': 'rc'}
+
+
+@functools.lru_cache(maxsize=65536)
+def version_key(version):
+    """Sort key for a version string, ordered like pkg_resources.parse_version.
+
+    PEP 440 versions, including the `git describe` based ones versioneer
+    produces (e.g. '0.1.1+0.g3c5592b.dirty'), map to a tuple of plain ints,
+    strings and tuples. Anything else (e.g. raw '0.1.1-3-g3c5592b') falls back
+    to setuptools' legacy ordering and sorts before every PEP 440 version.
+    Keys are memoized.
+
+    Parameters
+    ----------
+    version : str
+
+    Examples
+    --------
+    >>> sorted(['0.10', '0.2', '0.1.1+0.g3c5592b.dirty'], key=version_key)
+    """
+    match = _version_re.match(version)
+    if match is None:
+        return(_legacy_key(version))
+    release = tuple(int(i) for i in match.group('release').split('.'))
+    while release and release[-1] == 0:
+        release = release[:-1]
+    pre_l, pre_n = match.group('pre_l'), match.group('pre_n')
+    post_n = match.group('post_n1') or match.group('post_n2')
+    has_post = match.group('post') is not None
+    has_dev = match.group('dev') is not None
+    # Pre-release: dev-only releases sort before any pre-release, final
+    # releases after. Post and dev are -1 and infinity when absent.
+    if pre_l is not None:
+        pre_l = pre_l.lower()
+        pre = (1, _letters.get(pre_l, pre_l), int(pre_n or 0))
+    elif not has_post and has_dev:
+        pre = (0,)
+    else:
+        pre = (2,)
+    post = int(post_n or 0) if has_post else -1
+    dev = int(match.group('dev_n') or 0) if has_dev else math.inf
+    local = match.group('local')
+    if local is None:
+        local = (0,)
+    else:
+        local = (1, tuple((1, int(part), '') if part.isdigit() else (0, 0, part.lower())
+                          for part in _local_separators.split(local)))
+    return((int(match.group('epoch') or 0), release, pre, post, dev, local))
+
+
+def _legacy_key(version):
+    parts = []
+    for part in _legacy_parts(version.lower()):
+        if part.startswith('*'):
+            if part < '*final':
+                while parts and parts[-1] == '*final-':
+                    parts.pop()
+            while parts and parts[-1] == '00000000':
+                parts.pop()
+        parts.append(part)
+    return((-1, tuple(parts)))
+
+
+def _legacy_parts(version):
+    for part in _legacy_component_re.split(version):
+        part = _legacy_replacements.get(part, part)
+        if not part or part == '.':
+            continue
+        if part[:1] in '0123456789':
+            yield part.zfill(8)
+        else:
+            yield '*' + part
+    yield '*final'
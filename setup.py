@@ -23,6 +23,6 @@ setup(
     url='https://github.com/TarjinderSingh/datatracker',
     license='MIT',
     python_requires='>=3.7',
-    packages=find_packages(exclude=('tests', 'docs')),
+    packages=find_packages(exclude=('tests', 'docs', 'benchmarks', 'benchmarks.*')),
     install_requires=dependencies
 )
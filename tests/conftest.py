@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+
+import pytest
+from datatracker import fs
+from datatracker.fs import LocalAsyncFS, set_fs
+
+
+@pytest.fixture
+def local_fs(tmp_path, monkeypatch):
+    """Serve gs:// paths from a temporary directory instead of the cloud."""
+    monkeypatch.setattr(fs, '_fs', None)
+    monkeypatch.setattr(fs, '_fs_is_default', False)
+    root = tmp_path / 'buckets'
+    root.mkdir()
+    set_fs(LocalAsyncFS(root=str(root)))
+    return(root)
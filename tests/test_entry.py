@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import subprocess
+import pytest
+from datatracker import Entry
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/io'), reason='requires /proc/self/io')
+def test_measured_io_includes_children(tmp_path, monkeypatch):
+    monkeypatch.setenv('VERSION', '1.0')
+    path = tmp_path / 'out.bin'
+    code = f"import os; f = open({str(path)!r}, 'wb'); f.write(bytes(8 << 20)); f.flush(); os.fsync(f.fileno())"
+    with Entry('tag', 'Entry', 'Processing', 'Tests') as entry:
+        subprocess.run([sys.executable, '-c', code], check=True)
+    assert entry['write_bytes'] >= 8 << 20
+    assert entry['cpu_time'] > 0
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import os
+import multiprocessing
+import pytest
+from datatracker import fs
+from datatracker.fs import LocalAsyncFS, get_fs
+from datatracker.utils import cloud_path_exists, gs_ls, gs_mirror, gs_rm, paths_exist, sync_down
+
+
+@pytest.fixture
+def bucket(local_fs):
+    """A local directory standing in for gs://bucket."""
+    (local_fs / 'bucket' / 'logs').mkdir(parents=True)
+    (local_fs / 'bucket' / 'logs' / 'a.log').write_text('a')
+    (local_fs / 'bucket' / 'logs' / 'b.log').write_text('b')
+    (local_fs / 'bucket' / 'logs' / 'c.txt').write_text('c')
+    return(local_fs)
+
+
+def test_cloud_path_exists(bucket):
+    assert cloud_path_exists('gs://bucket/logs/a.log')
+    assert not cloud_path_exists('gs://bucket/logs/missing.log')
+
+
+def test_paths_exist(bucket, tmp_path):
+    local = tmp_path / 'local.txt'
+    local.write_text('x')
+    paths = ['gs://bucket/logs/a.log', 'gs://bucket/missing', str(local), str(tmp_path / 'missing')]
+    assert paths_exist(paths, parallelism=2) == dict(zip(paths, [True, False, True, False]))
+
+
+def test_gs_ls(bucket):
+    assert gs_ls('gs://bucket/logs', pattern='.log$') == ['gs://bucket/logs/a.log', 'gs://bucket/logs/b.log']
+    assert gs_ls('gs://bucket/logs/c.txt') == 'gs://bucket/logs/c.txt'
+    assert gs_ls('gs://bucket/missing') == ''
+    assert gs_ls('gs://bucket') == 'gs://bucket/logs'
+
+
+def test_gs_rm(bucket):
+    assert gs_rm('gs://bucket/logs/a.log', recursive=False) == ''
+    assert not (bucket / 'bucket' / 'logs' / 'a.log').exists()
+    assert gs_rm('gs://bucket/logs') == ''
+    assert not (bucket / 'bucket' / 'logs').exists()
+    assert gs_rm('gs://bucket/missing') != ''
+
+
+def test_gs_mirror(bucket):
+    assert gs_mirror('gs://bucket/logs', 'gs://mirror/') == ''
+    assert sorted(os.listdir(bucket / 'mirror' / 'logs')) == ['a.log', 'b.log', 'c.txt']
+
+
+def test_sync_down(bucket, tmp_path):
+    local = tmp_path / 'local'
+    assert sync_down('gs://bucket/logs', str(local)) == ''
+    assert sorted(os.listdir(local)) == ['a.log', 'b.log']
+    (local / 'a.log').write_text('changed')
+    sync_down('gs://bucket/logs', str(local), flag='n')
+    assert (local / 'a.log').read_text() == 'changed'
+
+
+def _exists_in_child(path):
+    return(cloud_path_exists(path))
+
+
+def _default_fs_in_child(path):
+    return(type(get_fs()).__name__, get_fs().root, cloud_path_exists(path))
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_fork_after_fs_call(bucket):
+    # the parent starts the background event loop, which a forked child lacks
+    assert cloud_path_exists('gs://bucket/logs/a.log')
+    with multiprocessing.get_context('fork').Pool(2) as pool:
+        result = pool.map_async(_exists_in_child, ['gs://bucket/logs/a.log', 'gs://bucket/missing'])
+        assert result.get(timeout=30) == [True, False]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_fork_recreates_default_fs(bucket, monkeypatch):
+    async def default_fs():
+        return(LocalAsyncFS(root=str(bucket)))
+    monkeypatch.setattr(fs, '_default_fs', default_fs)
+    monkeypatch.setattr(fs, '_fs', None)
+    parent = get_fs()
+    assert cloud_path_exists('gs://bucket/logs/a.log')
+    with multiprocessing.get_context('fork').Pool(1) as pool:
+        name, root, exists = pool.apply_async(_default_fs_in_child, ['gs://bucket/logs/a.log']).get(timeout=30)
+    assert (name, root, exists) == ('LocalAsyncFS', str(bucket), True)
+    assert get_fs() is parent
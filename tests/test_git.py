@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import subprocess
+import pytest
+from datatracker import Entry, git
+from datatracker.git import describe, git_info, is_dirty
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    for key in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(key, 'Tests')
+    for key in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(key, 'tests@example.com')
+    monkeypatch.delenv('VERSION', raising=False)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'step.py').write_text('print(1)\n')
+    for command in (['init', '-q'], ['add', '.'], ['commit', '-q', '-m', 'first'],
+                    ['tag', '-a', 'v1.0', '-m', 'v1.0']):
+        subprocess.run(['git'] + command, check=True, cwd=tmp_path)
+    return(tmp_path)
+
+
+def test_describe_and_dirty(repo):
+    assert describe() == 'v1.0'
+    (repo / 'step.py').write_text('print(2)\n')
+    assert is_dirty()
+    entry = Entry('tag', 'Entry', 'Processing', 'Tests')
+    assert entry['version'] == 'v1.0' and entry['dirty'] is True
+    assert entry['git_hash'] == git_info()['git_hash']
+    subprocess.run(['git', 'commit', '-q', '-am', 'second'], check=True)
+    entry = Entry('tag', 'Entry', 'Processing', 'Tests')
+    assert entry['version'].startswith('v1.0-1-g') and entry['dirty'] is False
+
+
+def test_entries_run_git_once(repo, monkeypatch):
+    calls = []
+    run = subprocess.run
+    monkeypatch.setattr(git.subprocess, 'run', lambda *args, **kwargs: (calls.append(args[0]), run(*args, **kwargs))[1])
+    (repo / 'step.py').write_text('print(2)\n')
+    entries = [Entry(f"tag-{i}", 'Entry', 'Processing', 'Tests') for i in range(20)]
+    assert all(entry['dirty'] for entry in entries)
+    assert calls == [['git', 'status', '--porcelain', '--untracked-files=no']]
+
+
+def test_version_set_skips_git_status(repo, monkeypatch):
+    monkeypatch.setenv('VERSION', '2.0')
+    monkeypatch.setattr(git, 'is_dirty', lambda path=None: pytest.fail('ran git status'))
+    entry = Entry('tag', 'Entry', 'Processing', 'Tests')
+    assert entry['version'] == '2.0' and entry['dirty'] is None
+    assert entry['git_hash'] == git_info(dirty=False)['git_hash']
+    monkeypatch.delenv('VERSION')
+    assert Entry('tag', 'Entry', 'Processing', 'Tests', version='3.0')['dirty'] is None
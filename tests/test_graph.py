@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import random
+import pytest
+from datatracker.graph import LineageGraph
+from datatracker.index import TrackerIndex
+
+
+def files(*paths, entry_tag=None):
+    return([{'tag': f"f{i}", 'path': path, 'entry_tag': entry_tag} for i, path in enumerate(paths)])
+
+
+def doc(tag, inputs=(), outputs=(), entry_tag=None):
+    return({'tag': tag, 'input_files': files(*inputs, entry_tag=entry_tag), 'output_files': files(*outputs)})
+
+
+@pytest.fixture
+def graph():
+    # raw -> a -> b -> d, a -> c -> d, and e names a by entry_tag
+    return(LineageGraph({1: doc('a', ['/raw'], ['/a']), 2: doc('b', ['/a'], ['/b']),
+                         3: doc('c', ['/a'], ['/c']), 4: doc('d', ['/b', '/c'], ['/d']),
+                         5: doc('e', ['/copy-of-a'], entry_tag='a')}))
+
+
+def test_upstream_and_downstream(graph):
+    assert graph.upstream('d') == {'a', 'b', 'c'}
+    assert graph.upstream('a') == set()
+    assert graph.downstream('a') == {'b', 'c', 'd', 'e'}
+    assert graph.downstream(['b', 'c']) == {'d'}
+    assert 'e' in graph and len(graph) == 5
+
+
+def test_topological_order(graph):
+    assert graph.topological_order() == ['a', 'b', 'c', 'd', 'e']
+    assert graph.topological_order(['d', 'b']) == ['b', 'd']
+    graph.add(6, doc('a', ['/d'], ['/a2']))
+    with pytest.raises(ValueError, match='cycle'):
+        graph.topological_order()
+    assert graph.topological_order(['b', 'c']) == ['b', 'c']
+
+
+def test_incremental_add_and_discard_match_rebuild():
+    rng = random.Random(1)
+
+    def random_doc():
+        return(doc(f"t{rng.randrange(30)}", [f"/p{rng.randrange(60)}" for _ in range(rng.randint(0, 3))],
+                   [f"/p{rng.randrange(60)}" for _ in range(rng.randint(0, 2))],
+                   entry_tag=rng.choice([None, f"t{rng.randrange(30)}"])))
+
+    graph, docs = LineageGraph(), {}
+    for step in range(3000):
+        if docs and rng.random() < 0.4:
+            doc_id = rng.choice(list(docs))
+            graph.discard(doc_id, docs.pop(doc_id))
+        else:
+            docs[step] = random_doc()
+            graph.add(step, docs[step])
+    rebuilt = LineageGraph(docs)
+    assert {k: dict(v) for k, v in graph.children.items()} == {k: dict(v) for k, v in rebuilt.children.items()}
+    assert {k: dict(v) for k, v in graph.parents.items()} == {k: dict(v) for k, v in rebuilt.parents.items()}
+    assert dict(graph.producers) == dict(rebuilt.producers)
+    assert dict(graph.consumers) == dict(rebuilt.consumers)
+    for doc_id in list(docs):
+        graph.discard(doc_id, docs.pop(doc_id))
+    assert not graph.children and not graph.parents and not graph.nodes and len(graph) == 0
+
+
+def test_index_lineage_follows_most_recent():
+    def entry(tag, version, most_recent, **kwargs):
+        return(dict(doc(tag, **kwargs), version=version, tag_version=f"{tag}_{version}",
+                    most_recent=most_recent, time=float(version)))
+
+    index = TrackerIndex()
+    index.add(1, entry('b', '1', True, outputs=['/x/b']))
+    index.add(2, entry('a', '1', True, inputs=['/x/b'], outputs=['/x/a']))
+    assert index.lineage.downstream('b') == {'a'}
+    # a v2 no longer reads b's output; b v2 now reads a's
+    index.add(3, entry('a', '2', False, outputs=['/x/a']))
+    index.update(2, {'most_recent': False})
+    index.update(3, {'most_recent': True})
+    index.add(4, entry('b', '2', False, inputs=['/x/a'], outputs=['/x/b']))
+    index.update(1, {'most_recent': False})
+    index.update(4, {'most_recent': True})
+    assert index.lineage.downstream('b') == set()
+    assert index.lineage.downstream('a') == {'b'}
+    assert index.lineage.topological_order() == ['a', 'b']
+    rebuilt = TrackerIndex()
+    for doc_id, document in index.docs.items():
+        rebuilt.add(doc_id, document)
+    assert rebuilt.lineage.topological_order() == ['a', 'b']
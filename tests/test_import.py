@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import subprocess
+
+HEAVY_MODULES = ('pandas', 'pkg_resources', 'datatracker._version')
+
+
+def test_import_does_not_load_heavy_modules():
+    code = ('import sys, json, datatracker; '
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    p = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True, cwd=root)
+    assert json.loads(p.stdout) == []
+
+
+def test_version_is_resolved_on_demand():
+    code = 'import sys, datatracker; datatracker.__version__; print("datatracker._version" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    p = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True, cwd=root)
+    assert p.stdout.strip() == b'True'
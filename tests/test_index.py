@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+import random
+from datatracker.index import TrackerIndex
+
+
+def random_doc(rng, i):
+    tag = f"t{rng.randrange(20)}"
+    version = str(rng.randrange(3))
+    inputs = [{'tag': 'in', 'path': f"gs://bucket/p{rng.randrange(30)}",
+               'entry_tag': rng.choice([None, f"t{rng.randrange(20)}"]), 'version': str(rng.randrange(3))}
+              for _ in range(rng.randint(0, 3))]
+    outputs = [{'tag': f"out{j}", 'path': f"gs://bucket/p{rng.randrange(30)}"} for j in range(rng.randint(0, 2))]
+    return({'tag': tag, 'version': version, 'tag_version': f"{tag}_{version}", 'time': i,
+            'most_recent': rng.random() < 0.7, 'input_files': inputs, 'output_files': outputs})
+
+
+def test_outdated_is_kept_up_to_date():
+    rng = random.Random(0)
+    index = TrackerIndex()
+    for step in range(1500):
+        action = rng.random()
+        if index.docs and action < 0.3:
+            index.discard(rng.choice(list(index.docs)))
+        elif index.docs and action < 0.5:
+            index.update(rng.choice(list(index.docs)), {'most_recent': rng.random() < 0.5})
+        elif index.docs and action < 0.55:
+            other = random_doc(rng, step)
+            index.update(rng.choice(list(index.docs)), {'input_files': other['input_files']})
+        else:
+            index.add(step, random_doc(rng, step))
+        if step % 10 == 0:
+            fresh = TrackerIndex()
+            for doc_id, doc in index.docs.items():
+                fresh.add(doc_id, doc)
+            assert index.outdated() == fresh.outdated()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import random
+import pytest
+from tinydb import Query
+from datatracker import Entry, Tracker
+from datatracker.query import QueryPlan
+
+q = Query()
+
+QUERIES = [
+    q.tag == 't1',
+    q.tag == 'missing',
+    q.version == '0.2',
+    q.tag_version == 't2_0.1',
+    q.module == 'm0',
+    q.category == 'c1',
+    q.most_recent == True,
+    q.most_recent == False,
+    q.time == 1003,
+    q.tag.one_of(['t0', 't3', 'missing']),
+    q.version.one_of([]),
+    q.time > 1010,
+    q.time >= 1010,
+    q.time < 1005.5,
+    q.time <= 1005,
+    (q.time > 1002) & (q.time <= 1020),
+    (q.tag == 't1') & (q.most_recent == True),
+    (q.tag == 't1') | (q.module == 'm2'),
+    (q.tag == 't1') | (q.time > 1030),
+    ~(q.tag == 't1'),
+    ~((q.tag == 't1') | (q.most_recent == True)),
+    (q.tag == 't1') & ~(q.version == '0.1'),
+    (q.tag == 't2') & q.description.matches('.*odd.*'),
+    q.description.matches('.*odd.*') | (q.tag == 't0'),
+    (q.module == 'm1') & (q.extra == 3),
+    q.extra.exists() & (q.time > 1000),
+    (q.tag.one_of(['t1', 't2']) & (q.time < 1025)) | ((q.category == 'c0') & ~(q.most_recent == True)),
+    q.time.test(lambda t: int(t) % 3 == 0),
+    q.output_files.any(q.tag == 'out'),
+]
+
+
+@pytest.fixture(scope='module')
+def tracker(tmp_path_factory):
+    rng = random.Random(0)
+    tr = Tracker(str(tmp_path_factory.mktemp('query') / 'tracker.json'))
+    entries = []
+    for i in range(40):
+        entry = Entry(f"t{i % 5}", 'odd step' if i % 2 else 'even step', f"c{i % 2}", f"m{i % 3}",
+                      version=f"0.{rng.randrange(4)}")
+        entry['time'] = 1000 + i + (0.5 if i % 4 == 0 else 0)
+        if i % 3 == 0:
+            entry['extra'] = rng.randrange(5)
+        if i % 6 == 0:
+            entry['output_files'].append({'tag': 'out', 'path': f"gs://bucket/{i}"})
+        entries.append(entry)
+    tr.save_many(entries)
+    return(tr)
+
+
+@pytest.mark.parametrize('cond', QUERIES, ids=[str(i) for i in range(len(QUERIES))])
+def test_filter_matches_tinydb_search(tracker, cond):
+    expected = sorted(doc.doc_id for doc in tracker.db.search(cond))
+    assert [doc.doc_id for doc in tracker.filter(cond)] == expected
+
+
+def test_simple_queries_use_the_index(tracker):
+    plan = QueryPlan((q.tag == 't1') & (q.time > 1010), tracker.index)
+    assert plan.candidates is not None and plan.exact
+    plan.run()
+    assert plan.scanned == 0
+    plan = QueryPlan((q.tag == 't2') & q.description.matches('.*odd.*'), tracker.index)
+    assert plan.candidates == tracker.index.tags['t2'] and not plan.exact
+    assert QueryPlan(~(q.tag == 't1'), tracker.index).candidates is None
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+from datatracker.storage import AtomicJSONStorage, JournalStorage, SQLiteStorage, get_storage
+
+
+def test_get_storage_from_extension(tmp_path):
+    assert get_storage(str(tmp_path / 'tracker.json')) is AtomicJSONStorage
+    assert get_storage(str(tmp_path / 'tracker.db')) is SQLiteStorage
+    assert get_storage(str(tmp_path / 'tracker.db'), storage='json') is AtomicJSONStorage
+
+
+def test_existing_json_db_file_stays_json(tmp_path):
+    path = tmp_path / 'tracker.db'
+    path.write_text(json.dumps({'_default': {}}))
+    assert get_storage(str(path)) is AtomicJSONStorage
+    path.write_text('')
+    assert get_storage(str(path)) is SQLiteStorage
+
+
+def test_existing_sqlite_db_file_is_sqlite(tmp_path):
+    path = tmp_path / 'tracker.db'
+    sqlite3.connect(str(path)).execute('CREATE TABLE t (x)').connection.commit()
+    assert get_storage(str(path)) is SQLiteStorage
+
+
+def table(*docs):
+    return({'_default': {str(i): doc for i, doc in enumerate(docs, 1)}})
+
+
+def lines(path):
+    with open(path) as f:
+        return(f.read().splitlines())
+
+
+def test_journal_replays_records_from_another_writer(tmp_path):
+    path = str(tmp_path / 'tracker.jsonl')
+    writer, reader = JournalStorage(path), JournalStorage(path)
+    writer.write(table({'tag': 'a'}))
+    assert reader.read() == table({'tag': 'a'})
+    replayed = reader.bytes_read
+    writer.write(table({'tag': 'a'}, {'tag': 'b'}))
+    assert reader.read() == table({'tag': 'a'}, {'tag': 'b'})
+    # only the appended record is read again
+    assert reader.bytes_read - replayed == len(lines(path)[-1]) + 1
+    reader.write({'_default': {'2': {'tag': 'b'}}})
+    assert writer.read() == {'_default': {'2': {'tag': 'b'}}}
+    assert JournalStorage(path).read() == {'_default': {'2': {'tag': 'b'}}}
+
+
+def test_journal_ignores_and_overwrites_torn_last_line(tmp_path):
+    path = str(tmp_path / 'tracker.jsonl')
+    JournalStorage(path).write(table({'tag': 'a'}))
+    with open(path, 'a') as f:
+        f.write('{"op": "put", "table": "_default", "id": "2", "doc": {"ta')
+    storage = JournalStorage(path)
+    assert storage.read() == table({'tag': 'a'})
+    storage.write(table({'tag': 'a'}, {'tag': 'c'}))
+    assert all(json.loads(line) for line in lines(path))
+    assert JournalStorage(path).read() == table({'tag': 'a'}, {'tag': 'c'})
+
+
+def test_journal_compacts_past_threshold(tmp_path):
+    path = str(tmp_path / 'tracker.jsonl')
+    storage = JournalStorage(path, compact_ratio=2, min_records=4)
+    for i in range(20):
+        storage.write(table({'tag': 'a', 'time': i}, {'tag': 'b'}))
+        assert len(lines(path)) <= 4
+    assert len(lines(path)) < 20
+    assert JournalStorage(path).read() == table({'tag': 'a', 'time': 19}, {'tag': 'b'})
+
+
+def test_journal_rereads_after_another_process_compacts(tmp_path):
+    path = str(tmp_path / 'tracker.jsonl')
+    writer, other = JournalStorage(path), JournalStorage(path)
+    for i in range(5):
+        writer.write(table({'tag': 'a', 'time': i}))
+    assert other.read() == table({'tag': 'a', 'time': 4})
+    writer.compact()
+    assert len(lines(path)) == 1
+    assert other.read() == table({'tag': 'a', 'time': 4})
+    other.write(table({'tag': 'a', 'time': 5}, {'tag': 'b'}))
+    assert writer.read() == table({'tag': 'a', 'time': 5}, {'tag': 'b'})
+    assert JournalStorage(path).read() == table({'tag': 'a', 'time': 5}, {'tag': 'b'})
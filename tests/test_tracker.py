@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import pytest
+from datatracker import Entry, InputFile, OutputFile, Tracker
+
+BACKENDS = ['tracker.json', 'tracker.sqlite', 'tracker.jsonl']
+
+
+@pytest.fixture(autouse=True)
+def version(monkeypatch, local_fs):
+    monkeypatch.setenv('VERSION', '1.0')
+
+
+def make_entry(tag, inputs=(), outputs=(), version=None):
+    entry = Entry(tag=tag, description='Entry', category='Processing', module='Tests', version=version)
+    for path in inputs:
+        entry.add(InputFile(tag='input', path=path, description='Input'))
+    for path in outputs:
+        entry.add(OutputFile(tag='output', path=path, description='Output'))
+    return(entry)
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_saved_entry_does_not_alias_caller(tmp_path, name):
+    tr = Tracker(str(tmp_path / name))
+    a = make_entry('a', outputs=['gs://bucket/a.tsv'])
+    tr.save(a)
+    tr.save(make_entry('b', inputs=['gs://bucket/a.tsv']))
+    a['output_files'][0]['path'] = 'gs://bucket/other.tsv'
+    a['output_files'].append({'tag': 'extra', 'path': 'gs://bucket/extra.tsv'})
+    assert tr.graph().upstream('b') == {'a'}
+    assert [f['path'] for f in tr.get_entry('a')['output_files']] == ['gs://bucket/a.tsv']
+    tr.save(make_entry('c'))
+    reopened = Tracker(str(tmp_path / name))
+    assert [f['path'] for f in reopened.get_entry('a')['output_files']] == ['gs://bucket/a.tsv']
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_returned_entries_are_copies(tmp_path, name):
+    tr = Tracker(str(tmp_path / name))
+    tr.save(make_entry('a', outputs=['gs://bucket/a.tsv']))
+    tr.get_entry('a')['output_files'].clear()
+    tr.entries[0]['output_files'].clear()
+    tr.filter(tr.entry.tag == 'a')[0]['output_files'].clear()
+    tr['output_files'][0].clear()
+    assert len(tr.get_entry('a')['output_files']) == 1
+    assert tr.find_path('gs://bucket/a.tsv')
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_save_writes_database_once(tmp_path, name):
+    tr = Tracker(str(tmp_path / name))
+    tr.save(make_entry('a', outputs=['gs://bucket/a.tsv']))
+    storage = tr.db.storage.storage
+    writes = []
+    write = storage.write
+    storage.write = lambda data: (writes.append(1), write(data))
+    tr.save(make_entry('a', outputs=['gs://bucket/a.tsv']))
+    tr.save(make_entry('b'))
+    with tr.batch():
+        tr.save(make_entry('c'))
+        tr.label_recent()
+        tr.save(make_entry('d'))
+    assert len(writes) == 3
+    assert sorted(e['tag'] for e in Tracker(str(tmp_path / name)).entries) == ['a', 'b', 'c', 'd']
+
+
+def test_json_tracker_named_db(tmp_path):
+    path = str(tmp_path / 'tracker.json')
+    Tracker(path).save(make_entry('a'))
+    db = str(tmp_path / 'tracker.db')
+    os.rename(path, db)
+    tr = Tracker(db)
+    assert tr.get_entry('a')['tag'] == 'a'
+    tr.save(make_entry('b'))
+    assert len(Tracker(db)) == 2
+
+
+def cached_step(tr, local_fs):
+    entry = make_entry('step', inputs=['gs://bucket/in.tsv'])
+    if entry.cached(tr):
+        return(False)
+    (local_fs / 'bucket' / 'out.tsv').write_text('result')
+    entry.add(OutputFile(tag='output', path='gs://bucket/out.tsv', description='Output'))
+    tr.save(entry)
+    return(True)
+
+
+def test_cached_step_reruns_after_input_changes(tmp_path, local_fs):
+    (local_fs / 'bucket').mkdir()
+    (local_fs / 'bucket' / 'in.tsv').write_text('first')
+    tr = Tracker(str(tmp_path / 'tracker.json'))
+    assert cached_step(tr, local_fs)
+    assert not cached_step(tr, local_fs)
+    (local_fs / 'bucket' / 'in.tsv').write_text('second version')
+    assert cached_step(tr, local_fs)
+    (local_fs / 'bucket' / 'out.tsv').unlink()
+    assert cached_step(tr, local_fs)
+
+
+def test_stale_ignores_cycles_through_old_versions(tmp_path):
+    tr = Tracker(str(tmp_path / 'tracker.json'))
+    tr.save(make_entry('b', outputs=['gs://bucket/x/b'], version='1'))
+    tr.save(make_entry('a', inputs=['gs://bucket/x/b'], outputs=['gs://bucket/x/a'], version='1'))
+    # after a refactor b reads a's output instead of the other way round
+    tr.save(make_entry('a', outputs=['gs://bucket/x/a'], version='2'))
+    tr.save(make_entry('b', inputs=['gs://bucket/x/a'], outputs=['gs://bucket/x/b'], version='2'))
+    assert [e['tag'] for e in tr.stale()] == []
+    tr.save(make_entry('a', outputs=['gs://bucket/x/a'], version='3'))
+    assert [(e['tag'], e['version']) for e in tr.stale()] == [('b', '2')]
+    assert [(e['tag'], e['version']) for e in Tracker(str(tmp_path / 'tracker.json')).stale()] == [('b', '2')]
+    assert tr.graph().topological_order() == ['a', 'b']
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_threads_sharing_a_tracker(tmp_path, name):
+    tr = Tracker(str(tmp_path / name))
+    errors = []
+
+    def work(worker):
+        try:
+            for i in range(40):
+                tr.save(make_entry(f"worker-{worker}", outputs=[f"gs://bucket/{worker}/{i}"], version=str(i)))
+                tr.get_entry(f"worker-{worker}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    for tracker in (tr, Tracker(str(tmp_path / name))):
+        assert len(tracker) == 320
+        assert len(set(tracker['tag_version'])) == 320
+        assert sorted(e['version'] for e in tracker.filter(tracker.entry.most_recent == True)) == ['39'] * 8
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import random
+import warnings
+import pytest
+from datatracker.versions import version_key
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    pkg_resources = pytest.importorskip('pkg_resources')
+
+SEPARATORS = ['', '.', '-', '_']
+
+
+def pep440_version(rng):
+    """Random PEP 440 version, in the normalized and the loose spellings."""
+    parts = [rng.choice(['', 'v', 'V'])]
+    if rng.random() < 0.1:
+        parts.append(f"{rng.randint(0, 2)}!")
+    parts.append('.'.join(str(rng.choice([0, 0, 1, 2, 10, 11])) for _ in range(rng.randint(1, 4))))
+    if rng.random() < 0.3:
+        label = rng.choice(['a', 'b', 'c', 'rc', 'alpha', 'beta', 'pre', 'preview', 'RC'])
+        number = rng.choice(['', '0', '1', '2'])
+        parts.append(rng.choice(SEPARATORS) + label + (rng.choice(SEPARATORS) + number if number else ''))
+    if rng.random() < 0.3:
+        if rng.random() < 0.3:
+            parts.append(f"-{rng.randint(0, 3)}")
+        else:
+            number = rng.choice(['', '0', '1', '3'])
+            parts.append(rng.choice(SEPARATORS) + rng.choice(['post', 'rev', 'r'])
+                         + (rng.choice(SEPARATORS) + number if number else ''))
+    if rng.random() < 0.3:
+        number = rng.choice(['', '0', '1', '4'])
+        parts.append(rng.choice(SEPARATORS) + 'dev' + (rng.choice(SEPARATORS) + number if number else ''))
+    if rng.random() < 0.3:
+        segments = [rng.choice(['0', '1', '12', 'g3c5592b', 'dirty', 'ubuntu', 'Abc'])
+                    for _ in range(rng.randint(1, 3))]
+        parts.append('+' + ''.join(rng.choice(['.', '-', '_']) + s for s in segments)[1:])
+    return(''.join(parts))
+
+
+def describe_version(rng):
+    """Raw `git describe` output, which is not PEP 440."""
+    tag = rng.choice(['', 'v']) + '.'.join(str(rng.randint(0, 12)) for _ in range(rng.randint(1, 3)))
+    sha = ''.join(rng.choice('0123456789abcdef') for _ in range(7))
+    version = f"{tag}-{rng.randint(1, 40)}-g{sha}" if rng.random() < 0.8 else sha
+    return(version + ('-dirty' if rng.random() < 0.3 else ''))
+
+
+def junk_version(rng):
+    return(''.join(rng.choice('0123456789.-_+abcdeglprstvx') for _ in range(rng.randint(1, 12))))
+
+
+def versions(seed, count=3000):
+    rng = random.Random(seed)
+    generators = [pep440_version, pep440_version, describe_version, junk_version]
+    return([rng.choice(generators)(rng) for _ in range(count)])
+
+
+def compare(a, b):
+    return((a > b) - (a < b))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_version_key_orders_like_parse_version(seed):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        pairs = [(v, version_key(v), pkg_resources.parse_version(v)) for v in versions(seed)]
+    rng = random.Random(seed)
+    for _ in range(20000):
+        (a, key_a, parsed_a), (b, key_b, parsed_b) = rng.choice(pairs), rng.choice(pairs)
+        assert compare(key_a, key_b) == compare(parsed_a, parsed_b), (a, b)
+
+
+def test_sorted_like_parse_version():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        sample = versions(99, count=500)
+        assert [pkg_resources.parse_version(v) for v in sorted(sample, key=version_key)] == \
+            sorted(pkg_resources.parse_version(v) for v in sample)